@@ -129,6 +129,21 @@ class P115StrgmSub(_PluginBase):
 
     _MIN_INTERVAL_HOURS: int = 8
 
+    # 系统默认订阅站点可能使用的配置 key（按优先级）
+    _DEFAULT_SITE_CONFIG_KEYS: Tuple[str, ...] = (
+        "subscribe_sites",
+        "subscribe_site_ids",
+        "system_subscribe_sites",
+        "system_subscribe_site_ids",
+        "subscribe_sites_selected",
+    )
+    # 上次成功写入的默认订阅站点 key
+    _default_site_config_key: Optional[str] = None
+    # 上次成功写入的默认订阅站点ID
+    _last_default_site_ids: Optional[Tuple[int, ...]] = None
+    # SystemConfigOper 是否可用（None=尚未探测，仅导入失败时置为 False，每次 init_plugin 重置）
+    _systemconfig_available: Optional[bool] = None
+
     # ------------------ 调度器 ------------------
 
     def _ensure_toggle_scheduler(self):
@@ -208,12 +223,7 @@ class P115StrgmSub(_PluginBase):
                 continue
             final_ids.append(int(rec["id"]))
 
-        seen = set()
-        uniq = []
-        for x in final_ids:
-            if x not in seen:
-                seen.add(x)
-                uniq.append(x)
+        uniq = list(dict.fromkeys(final_ids))
 
         mapped = []
         for x in uniq:
@@ -222,61 +232,11 @@ class P115StrgmSub(_PluginBase):
         logger.info(f"订阅站点解析结果：ids={uniq} | 映射={mapped}")
         return uniq
 
-    def _ensure_115_site_id(self, db=None) -> int:
-        """
-        确保 115网盘 站点存在并返回 ID
-        :param db: 可选的数据库会话，若未传入则创建新会话
-        """
-        def _do_ensure(session):
-            row = session.execute(text("SELECT id FROM site WHERE name=:n LIMIT 1"), {"n": "115网盘"}).fetchone()
-            if row and row[0] is not None:
-                return int(row[0])
-
-            # existing = Site.get(session, -1)
-            row_ex = session.execute(text("SELECT id FROM site WHERE id=:i"), {"i": -1}).fetchone()
-            if not row_ex:
-                session.execute(
-                    text(
-                        "INSERT INTO site (id, name, url, is_active, limit_interval, limit_count, limit_seconds, timeout) "
-                        "VALUES (:id, :name, :url, :is_active, :limit_interval ,:limit_count, :limit_seconds, :timeout)"
-                    ),
-                    {
-                        "id": -1,
-                        "name": "115网盘",
-                        "url": "https://115.com",
-                        "is_active": True,
-                        "limit_interval": 10000000,
-                        "limit_count": 1,
-                        "limit_seconds": 10000000,
-                        "timeout": 1
-                    }
-                )
-                session.commit()
-                logger.info("已插入站点记录：115网盘(id=-1)")
-            return -1
-
-        if db is not None:
-            return _do_ensure(db)
-        else:
-            with SessionFactory() as new_db:
-                return _do_ensure(new_db)
-
     def _apply_sites_to_all_subscribes(self, site_ids: List[int], reason: str):
-        """ 应用站点ID到所有订阅 """
-        exclude_ids = set(self._exclude_subscribes or [])
-        with SessionFactory() as db:
-            # 复用 SubscribeOper 实例，避免循环中重复创建
-            subscribe_oper = SubscribeOper(db=db)
-            subs = subscribe_oper.list() or []
-            updated = 0
-            excluded = 0
-            for s in subs:
-                if s.id in exclude_ids:
-                    excluded += 1
-                    continue
-                subscribe_oper.update(s.id, {"sites": site_ids})
-                updated += 1
-        logger.info(f"{reason}：已更新 {updated} 个订阅（跳过 {excluded} 个排除订阅）")
+        """ 应用站点ID到所有订阅（批量写入，单次提交） """
+        if not self._subscribe_handler:
+            self._init_subscribe_handler()
+        self._subscribe_handler.apply_subscribe_sites_by_ids(site_ids, action_desc=reason)
 
     # ------------------ 禁用窗口判断 ------------------
 
@@ -300,9 +260,19 @@ class P115StrgmSub(_PluginBase):
         只在“已恢复系统订阅”时尝试设置系统默认订阅站点为窗口站点。
         若系统不存在对应key，会静默失败，不影响订阅 sites 已更新。
         """
+        # 与上次成功写入的站点一致时无需重复写入
+        site_ids_key = tuple(site_ids)
+        if site_ids_key == self._last_default_site_ids:
+            return
+
+        # 已确认系统没有 SystemConfigOper 时直接跳过，不再重复探测
+        if self._systemconfig_available is False:
+            return
+
         try:
             from app.db.systemconfig_oper import SystemConfigOper
-        except Exception:
+        except ImportError:
+            self._systemconfig_available = False
             return
 
         def _build_oper(db):
@@ -314,15 +284,8 @@ class P115StrgmSub(_PluginBase):
                 except Exception:
                     return None
 
-        candidate_keys = [
-            "subscribe_sites",
-            "subscribe_site_ids",
-            "system_subscribe_sites",
-            "system_subscribe_site_ids",
-            "subscribe_sites_selected",
-        ]
-
         with SessionFactory() as db:
+            # 构造或取方法失败可能只是暂时的，不标记为不可用，下次仍会重试
             oper = _build_oper(db)
             if not oper:
                 return
@@ -330,6 +293,14 @@ class P115StrgmSub(_PluginBase):
             set_fn = getattr(oper, "set", None) or getattr(oper, "set_by_key", None)
             if not get_fn or not set_fn:
                 return
+            self._systemconfig_available = True
+
+            # 上次命中的 key 优先尝试，减少对不存在 key 的探测
+            candidate_keys = self._DEFAULT_SITE_CONFIG_KEYS
+            if self._default_site_config_key:
+                candidate_keys = (self._default_site_config_key,) + tuple(
+                    k for k in candidate_keys if k != self._default_site_config_key
+                )
 
             for k in candidate_keys:
                 try:
@@ -340,6 +311,8 @@ class P115StrgmSub(_PluginBase):
                     continue
                 try:
                     set_fn(k, site_ids)
+                    self._default_site_config_key = k
+                    self._last_default_site_ids = site_ids_key
                     logger.info(f"已恢复系统订阅：已尝试同步默认订阅站点 key={k} value={site_ids}")
                     break
                 except Exception:
@@ -484,16 +457,10 @@ class P115StrgmSub(_PluginBase):
             self._init_subscribe_handler()
 
             if self._block_system_subscribe:
-                if hasattr(self._subscribe_handler, "set_sites_for_subscribe_only_115"):
-                    self._subscribe_handler.set_sites_for_subscribe_only_115(sid)
-                else:
-                    # 兜底：使用统一的 db session
-                    with SessionFactory() as db:
-                        site_id_115 = self._ensure_115_site_id(db)
-                        SubscribeOper(db=db).update(sid, {"sites": [site_id_115]})
+                self._subscribe_handler.set_sites_for_subscribe_only_115(sid)
                 logger.info(f"已屏蔽系统订阅：新增订阅已拉回仅115（subscribe_id={sid}）")
             else:
-                if self._window_enabled() and hasattr(self._subscribe_handler, "set_sites_for_subscribe_by_names"):
+                if self._window_enabled():
                     self._subscribe_handler.set_sites_for_subscribe_by_names(sid, self._unblock_site_names)
                     logger.info(f"已恢复系统订阅：新增订阅已同步窗口站点（subscribe_id={sid})")
 
@@ -629,6 +596,8 @@ class P115StrgmSub(_PluginBase):
     def init_plugin(self, config: dict = None):
         self.stop_service()
         self._ensure_toggle_scheduler()
+        self._last_default_site_ids = None
+        self._systemconfig_available = None
         download_so_file(Path(__file__).parent / "lib")
 
         if config:
@@ -751,6 +720,9 @@ class P115StrgmSub(_PluginBase):
                 proxy=proxy
             )
 
+        if self._nullbr_client:
+            self._nullbr_client.close()
+            self._nullbr_client = None
         if self._nullbr_enabled:
             if not self._nullbr_appid or not self._nullbr_api_key:
                 missing = []
@@ -777,6 +749,9 @@ class P115StrgmSub(_PluginBase):
                 logger.info(f"HDHive 配置已加载（模式：{self._hdhive_query_mode}）")
                 self._hdhive_client = None
 
+        if self._p115_manager:
+            self._p115_manager.close()
+            self._p115_manager = None
         if self._cookies:
             self._p115_manager = P115ClientManager(cookies=self._cookies)
 
@@ -909,6 +884,24 @@ class P115StrgmSub(_PluginBase):
         except Exception:
             pass
 
+        try:
+            if self._pansou_client:
+                self._pansou_client.close()
+        except Exception:
+            pass
+
+        try:
+            if self._p115_manager:
+                self._p115_manager.close()
+        except Exception:
+            pass
+
+        try:
+            if self._nullbr_client:
+                self._nullbr_client.close()
+        except Exception:
+            pass
+
     # ======================================================================
     # 必备：get_state / get_form / get_page / get_api / get_service
     # ======================================================================
@@ -1084,28 +1077,44 @@ class P115StrgmSub(_PluginBase):
             return True
 
         history: List[dict] = self.get_data('history') or []
+        history_index = self._sync_handler.index_history(history)
+        self._sync_handler.reset_sync_cache()
         transfer_details: List[Dict[str, Any]] = []
         transferred_count = 0
 
         exclude_ids = set(self._exclude_subscribes or [])
 
+        # Nullbr 是优先级最高的搜索源，按处理顺序分批并发预取接下来的订阅
+        prefetch_window = self._sync_handler.NULLBR_PREFETCH_WINDOW
+
         # 处理电影
-        for subscribe in movie_subscribes:
+        for index, subscribe in enumerate(movie_subscribes):
             if global_vars.is_system_stopped:
                 break
+            if index % prefetch_window == 0:
+                self._sync_handler.prefetch_nullbr_window(
+                    movie_subscribes[index:index + prefetch_window], MediaType.MOVIE,
+                    exclude_ids, history_index, transferred_count
+                )
             if subscribe.id in exclude_ids:
                 continue
             transferred_count = self._sync_handler.process_movie_subscribe(
                 subscribe=subscribe,
                 history=history,
                 transfer_details=transfer_details,
-                transferred_count=transferred_count
+                transferred_count=transferred_count,
+                history_index=history_index
             )
 
         # 处理剧集
-        for subscribe in tv_subscribes:
+        for index, subscribe in enumerate(tv_subscribes):
             if global_vars.is_system_stopped:
                 break
+            if index % prefetch_window == 0:
+                self._sync_handler.prefetch_nullbr_window(
+                    tv_subscribes[index:index + prefetch_window], MediaType.TV,
+                    exclude_ids, history_index, transferred_count
+                )
             if subscribe.id in exclude_ids:
                 continue
             transferred_count = self._sync_handler.process_tv_subscribe(
@@ -1113,9 +1122,12 @@ class P115StrgmSub(_PluginBase):
                 history=history,
                 transfer_details=transfer_details,
                 transferred_count=transferred_count,
-                exclude_ids=exclude_ids
+                exclude_ids=exclude_ids,
+                history_index=history_index
             )
 
+        # 等待下载历史写入完成
+        self._sync_handler.flush_download_history()
         self.save_data('history', history)
 
         logger.info(f"115 网盘订阅同步完成，共转存 {transferred_count} 个文件")
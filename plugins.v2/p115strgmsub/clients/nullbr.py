@@ -2,15 +2,28 @@
 Nullbr 资源查询客户端
 通过 TMDB ID 获取 115 网盘资源
 """
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, List, Dict, Any, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from app.log import logger
+try:
+    # orjson 直接解析 bytes，省去先解码为 str 的开销
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 
 class NullbrClient:
     """Nullbr 资源查询客户端"""
 
     BASE_URL = "https://api.nullbr.eu.org"
+    # 资源列表缓存有效期（秒），剧集更新较快，缓存时间更短
+    MOVIE_CACHE_TTL = 6 * 3600
+    TV_CACHE_TTL = 3600
 
     def __init__(self, app_id: str, api_key: str, proxy: str = None):
         """
@@ -22,73 +35,150 @@ class NullbrClient:
         """
         self.app_id = app_id
         self.api_key = api_key
+        # 必要配置只在初始化时检查一次，各接口直接使用结果
+        self._missing = [name for name, value in (("APP ID", app_id), ("API Key", api_key)) if not value]
+        self._config_ok = not self._missing
+        self._missing_msg = ", ".join(self._missing)
         self.headers = {
             "User-Agent": "MoviePilot/p115strgmsub",
             "Content-Type": "application/json",
             "X-APP-ID": app_id,
             "X-API-KEY": api_key
         }
-        # API 调用计数器
+        # API 调用计数器（批量查询时会在多个线程中累加）
         self._api_call_count = 0
+        self._count_lock = threading.Lock()
+        # 复用连接的会话，避免每次请求重新建立 TCP/TLS 连接
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+                raise_on_status=False
+            )
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # 资源列表缓存："movie:ID" / "tv:ID" -> (资源列表, 缓存时间)
+        self._resource_cache: Dict[str, Tuple[List[Dict[str, Any]], float]] = {}
+        self._cache_lock = threading.Lock()
         # 代理设置（兼容字符串和字典格式）
         if proxy:
             self._proxies = proxy if isinstance(proxy, dict) else {"http": proxy, "https": proxy}
         else:
             self._proxies = None
 
-    def get_movie_resources(self, tmdb_id: int) -> List[Dict[str, Any]]:
+    def _get_cached(self, key: str, ttl: int) -> Optional[List[Dict[str, Any]]]:
+        """获取缓存的资源列表，不存在或已过期时返回 None"""
+        with self._cache_lock:
+            cached = self._resource_cache.get(key)
+            if not cached:
+                return None
+            resources, timestamp = cached
+            if time.time() - timestamp > ttl:
+                del self._resource_cache[key]
+                return None
+            return resources
+
+    def _set_cached(self, key: str, resources: List[Dict[str, Any]]):
+        """缓存资源列表"""
+        with self._cache_lock:
+            self._resource_cache[key] = (resources, time.time())
+
+    def close(self):
+        """关闭会话，释放连接"""
+        self._session.close()
+
+    def clear_cache(self):
+        """清空资源列表缓存"""
+        with self._cache_lock:
+            self._resource_cache.clear()
+
+    def _request(self, path: str, timeout: int = 30) -> requests.Response:
         """
-        获取电影的 115 网盘资源
+        发起 GET 请求并累加调用计数
 
-        :param tmdb_id: TMDB 电影 ID
-        :return: 资源列表
+        :param path: 接口路径，如 /movie/278/115
+        :param timeout: 超时时间（秒）
+        :return: 响应对象
         """
-        if not self.api_key or not self.app_id:
-            missing = []
-            if not self.app_id:
-                missing.append("APP ID")
-            if not self.api_key:
-                missing.append("API Key")
-            logger.error(f"Nullbr 缺少必要配置：{', '.join(missing)}，请在插件设置中配置")
-            return []
+        with self._count_lock:
+            self._api_call_count += 1
+        return self._session.get(
+            f"{self.BASE_URL}{path}",
+            timeout=timeout,
+            proxies=self._proxies
+        )
 
-        try:
-            url = f"{self.BASE_URL}/movie/{tmdb_id}/115"
+    def _fetch_resources(self, path: str, media_name: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        请求资源列表接口
 
-            self._api_call_count += 1
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=30,
-                proxies=self._proxies
-            )
+        :param path: 接口路径
+        :param media_name: 日志中的媒体描述，如 "电影 278"
+        :return: 资源列表（未找到时为空列表），请求失败返回 None
+        """
+        try:
+            response = self._request(path)
 
             if response.status_code == 200:
-                data = response.json()
+                data = json_loads(response.content)
                 # 响应格式: {"115": [...], "id": 1396, "page": 1, "total_page": 1, "media_type": "movie"}
-                resources = data.get("115", [])
-                if resources:
-                    logger.info(f"Nullbr 获取电影 {tmdb_id} 资源成功，共 {len(resources)} 个")
-                    return resources
-                else:
-                    logger.info(f"Nullbr 未找到电影 {tmdb_id} 的资源")
-                    return []
+                if not isinstance(data, dict):
+                    logger.warning(f"Nullbr 返回格式异常：{media_name}")
+                    return None
+                return data.get("115", []) or []
             elif response.status_code == 401:
                 logger.error("Nullbr API Key 或 APP ID 无效或已过期")
-                return []
+                return None
             elif response.status_code == 404:
-                logger.info(f"Nullbr 未找到电影 {tmdb_id} 的资源")
                 return []
             else:
                 logger.warning(f"Nullbr 请求失败: HTTP {response.status_code}")
-                return []
+                return None
 
         except requests.exceptions.Timeout:
             logger.error("Nullbr 请求超时")
+            return None
+        except requests.RequestException as e:
+            logger.error(f"Nullbr 获取{media_name} 资源出错: {e}")
+            return None
+        except ValueError as e:
+            # json / orjson 的解析错误都是 ValueError 的子类
+            logger.error(f"Nullbr 解析{media_name} 资源响应出错: {e}")
+            return None
+
+    def get_movie_resources(self, tmdb_id: int) -> List[Dict[str, Any]]:
+        """
+        获取电影的 115 网盘资源
+
+        :param tmdb_id: TMDB 电影 ID
+        :return: 资源列表
+        """
+        if not self._config_ok:
+            logger.error(f"Nullbr 缺少必要配置：{self._missing_msg}，请在插件设置中配置")
             return []
-        except Exception as e:
-            logger.error(f"Nullbr 获取电影资源出错: {e}")
+
+        cache_key = f"movie:{tmdb_id}"
+        resources = self._get_cached(cache_key, self.MOVIE_CACHE_TTL)
+        action = "使用缓存的"
+        if resources is None:
+            resources = self._fetch_resources(f"/movie/{tmdb_id}/115", f"电影 {tmdb_id}")
+            if resources is None:
+                return []
+            self._set_cached(cache_key, resources)
+            action = "获取"
+
+        if not resources:
+            logger.info(f"Nullbr 未找到电影 {tmdb_id} 的资源")
             return []
+        logger.info(f"Nullbr {action}电影 {tmdb_id} 资源成功，共 {len(resources)} 个")
+        return list(resources)
 
     def get_tv_resources(self, tmdb_id: int, season: int = None) -> List[Dict[str, Any]]:
         """
@@ -98,96 +188,109 @@ class NullbrClient:
         :param season: 季号（可选，用于过滤返回结果）
         :return: 资源列表
         """
-        if not self.api_key or not self.app_id:
-            missing = []
-            if not self.app_id:
-                missing.append("APP ID")
-            if not self.api_key:
-                missing.append("API Key")
-            logger.error(f"Nullbr 缺少必要配置：{', '.join(missing)}，请在插件设置中配置")
+        if not self._config_ok:
+            logger.error(f"Nullbr 缺少必要配置：{self._missing_msg}，请在插件设置中配置")
             return []
 
-        try:
-            url = f"{self.BASE_URL}/tv/{tmdb_id}/115"
+        # 缓存完整资源列表，不同季号的查询共用同一份缓存
+        cache_key = f"tv:{tmdb_id}"
+        all_resources = self._get_cached(cache_key, self.TV_CACHE_TTL)
+        if all_resources is not None:
+            return self._filter_tv_resources(tmdb_id, all_resources, season, cached=True)
 
-            self._api_call_count += 1
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=30,
-                proxies=self._proxies
-            )
+        all_resources = self._fetch_resources(f"/tv/{tmdb_id}/115", f"电视剧 {tmdb_id}")
+        if all_resources is None:
+            return []
+        # 入缓存时把季列表转为集合，之后各季查询都是 O(1) 判断
+        for resource in all_resources:
+            resource["_season_set"] = frozenset(resource.get("season_list") or ())
+        self._set_cached(cache_key, all_resources)
+        return self._filter_tv_resources(tmdb_id, all_resources, season)
 
-            if response.status_code == 200:
-                data = response.json()
-                # 响应格式: {"115": [...], "id": 1396, "page": 1, "total_page": 1, "media_type": "tv"}
-                all_resources = data.get("115", [])
-                
-                if not all_resources:
-                    logger.info(f"Nullbr 未找到电视剧 {tmdb_id} 的资源")
-                    return []
-                
-                # 如果指定了季号，过滤包含该季的资源
-                if season:
-                    season_str = f"S{season}"
-                    filtered_resources = [
-                        r for r in all_resources
-                        if season_str in r.get("season_list", [])
-                    ]
-                    logger.info(f"Nullbr 获取电视剧 {tmdb_id} S{season} 资源成功，共 {len(filtered_resources)} 个")
-                    return filtered_resources
-                else:
-                    logger.info(f"Nullbr 获取电视剧 {tmdb_id} 所有资源成功，共 {len(all_resources)} 个")
-                    return all_resources
-                    
-            elif response.status_code == 401:
-                logger.error("Nullbr API Key 或 APP ID 无效或已过期")
-                return []
-            elif response.status_code == 404:
-                logger.info(f"Nullbr 未找到电视剧 {tmdb_id} 的资源")
-                return []
-            else:
-                logger.warning(f"Nullbr 请求失败: HTTP {response.status_code}")
-                return []
+    @staticmethod
+    def _filter_tv_resources(
+        tmdb_id: int,
+        all_resources: List[Dict[str, Any]],
+        season: int = None,
+        cached: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        按季号过滤电视剧资源
 
-        except requests.exceptions.Timeout:
-            logger.error("Nullbr 请求超时")
-            return []
-        except Exception as e:
-            logger.error(f"Nullbr 获取电视剧资源出错: {e}")
+        :param tmdb_id: TMDB 电视剧 ID
+        :param all_resources: 全部资源
+        :param season: 季号，为空时返回全部资源
+        :param cached: 是否来自缓存（仅用于日志）
+        :return: 资源列表
+        """
+        action = "使用缓存的" if cached else "获取"
+        if not all_resources:
+            logger.info(f"Nullbr 未找到电视剧 {tmdb_id} 的资源")
             return []
 
+        # 如果指定了季号，过滤包含该季的资源
+        if season:
+            season_str = f"S{season}"
+            filtered_resources = [r for r in all_resources if season_str in r["_season_set"]]
+            logger.info(f"Nullbr {action}电视剧 {tmdb_id} S{season} 资源成功，共 {len(filtered_resources)} 个")
+            return filtered_resources
+        else:
+            logger.info(f"Nullbr {action}电视剧 {tmdb_id} 所有资源成功，共 {len(all_resources)} 个")
+            return list(all_resources)
+
+    def get_many(
+        self,
+        queries: List[Tuple[str, int]],
+        max_workers: int = 8
+    ) -> Dict[Tuple[str, int], List[Dict[str, Any]]]:
+        """
+        并发获取多个 TMDB ID 的资源列表，结果同时写入缓存
+        Nullbr 没有批量接口，这里只是让多次请求的网络等待互相重叠
+
+        :param queries: [(媒体类型 "movie"/"tv", TMDB ID), ...]
+        :param max_workers: 最大并发数
+        :return: {(媒体类型, TMDB ID): 资源列表}，电视剧为未按季过滤的完整列表
+        """
+        queries = list(dict.fromkeys(q for q in queries if q[1]))
+        if not queries or not self._config_ok:
+            return {}
+
+        def _fetch(media_type: str, tmdb_id: int) -> List[Dict[str, Any]]:
+            if media_type == "movie":
+                return self.get_movie_resources(tmdb_id)
+            return self.get_tv_resources(tmdb_id)
+
+        results: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(queries))),
+            thread_name_prefix="p115strgmsub-nullbr"
+        ) as executor:
+            futures = {executor.submit(_fetch, *query): query for query in queries}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.error(f"Nullbr 批量获取资源出错: {futures[future]}, {e}")
+        return results
+
     def check_connection(self) -> bool:
         """
         检查 API 连接状态
 
         :return: 是否连接成功
         """
-        if not self.api_key or not self.app_id:
-            missing = []
-            if not self.app_id:
-                missing.append("APP ID")
-            if not self.api_key:
-                missing.append("API Key")
-            logger.warning(f"Nullbr 连接检查失败：缺少{', '.join(missing)}")
+        if not self._config_ok:
+            logger.warning(f"Nullbr 连接检查失败：缺少{self._missing_msg}")
             return False
 
         try:
             # 使用一个知名电影的 TMDB ID 来测试连接（例如：肖申克的救赎 278）
-            url = f"{self.BASE_URL}/movie/278/115"
-
-            self._api_call_count += 1
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=10,
-                proxies=self._proxies
-            )
+            response = self._request("/movie/278/115", timeout=10)
 
             # 200 表示成功，404 表示未找到但连接正常
-            return response.status_code in [200, 404]
+            return response.status_code in {200, 404}
 
-        except Exception as e:
+        except requests.RequestException as e:
             logger.error(f"Nullbr 连接检查失败: {e}")
             return False
 
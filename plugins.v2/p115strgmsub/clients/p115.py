@@ -1,10 +1,13 @@
 """
 115网盘客户端封装
 """
+import random
+import re
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from functools import wraps
+from functools import lru_cache, wraps
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any, Tuple, Callable
 
@@ -18,6 +21,38 @@ except ImportError:
     P115_AVAILABLE = False
     logger.warning("p115client 未安装，115网盘功能不可用，请安装: pip install p115client")
 
+# 常见的季数目录命名模式（按优先级排列，模块加载时编译一次）
+_SEASON_DIR_PATTERNS = (
+    re.compile(r'[Ss]eason\s*(\d+)'),              # Season 1, season1
+    re.compile(r'[Ss](\d+)'),                      # S1, s01
+    re.compile(r'第(\d+)季'),                      # 第1季
+    re.compile(r'第([一二三四五六七八九十]+)季'),  # 第一季
+)
+
+# 转存时可重试的限流错误码
+_RATE_LIMIT_ERRNOS = frozenset({990001, 990002, 990009})
+
+# 转存失败信息中表示文件已存在的关键词
+_DUPLICATE_RE = re.compile(r"重复|已存在")
+
+# 中文数字映射
+_CN_NUM_MAP = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
+               '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
+
+
+@lru_cache(maxsize=1024)
+def _normalize_path(path: str) -> str:
+    """
+    规范化网盘路径：统一分隔符、补全开头的 /、去掉末尾的 /（结果缓存，同一路径只处理一次）
+
+    :param path: 原始路径
+    :return: 规范化后的路径，根目录返回空字符串
+    """
+    path = path.replace("\\", "/")
+    if not path.startswith("/"):
+        path = "/" + path
+    return path.rstrip("/")
+
 
 @dataclass
 class ShareLinkStatus:
@@ -57,6 +92,8 @@ class RateLimiter:
     确保请求之间有最小间隔，并添加随机抖动避免触发风控
     """
 
+    __slots__ = ("min_interval", "jitter_ratio", "last_request_time", "_lock")
+
     def __init__(self, min_interval: float = 1.5, jitter_ratio: float = 0.3):
         """
         :param min_interval: 基础请求间隔（秒），实际间隔会在此基础上随机浮动
@@ -69,20 +106,18 @@ class RateLimiter:
 
     def _get_jittered_interval(self) -> float:
         """获取带随机抖动的间隔时间"""
-        import random
         jitter = self.min_interval * self.jitter_ratio
         return self.min_interval + random.uniform(-jitter, jitter)
 
     def wait(self):
         """等待直到可以发起下一次请求（带随机抖动）"""
+        # 锁内只预约下一个请求时间点，睡眠在锁外进行，避免持锁等待阻塞其他线程预约
         with self._lock:
-            now = time.time()
-            elapsed = now - self.last_request_time
-            target_interval = self._get_jittered_interval()
-            if elapsed < target_interval:
-                sleep_time = target_interval - elapsed
-                time.sleep(sleep_time)
-            self.last_request_time = time.time()
+            slot = max(time.time(), self.last_request_time + self._get_jittered_interval())
+            self.last_request_time = slot
+        sleep_time = slot - time.time()
+        if sleep_time > 0:
+            time.sleep(sleep_time)
 
     def acquire(self):
         """获取请求许可（wait 的别名）"""
@@ -132,6 +167,8 @@ class PathCache:
     路径缓存，带 TTL（生存时间）支持
     """
 
+    __slots__ = ("default_ttl", "_cache", "_lock")
+
     def __init__(self, default_ttl: int = 3600):
         """
         :param default_ttl: 默认缓存过期时间（秒）
@@ -142,14 +179,18 @@ class PathCache:
 
     def get(self, path: str) -> Optional[int]:
         """获取缓存的 CID，如果缓存过期则返回 None"""
-        with self._lock:
-            if path not in self._cache:
-                return None
-            cid, timestamp = self._cache[path]
-            if time.time() - timestamp > self.default_ttl:
-                del self._cache[path]
-                return None
-            return cid
+        # 命中时无需加锁：单次 dict.get 在 GIL 下是原子的，取到的是不可变元组
+        entry = self._cache.get(path)
+        if entry is None:
+            return None
+        cid, timestamp = entry
+        if time.time() - timestamp > self.default_ttl:
+            # 仅在删除过期条目时加锁，并确认条目未被其他线程更新
+            with self._lock:
+                if self._cache.get(path) is entry:
+                    del self._cache[path]
+            return None
+        return cid
 
     def set(self, path: str, cid: int):
         """设置缓存"""
@@ -179,6 +220,9 @@ class P115ClientManager:
     DEFAULT_PATH_CACHE_TTL = 3600   # 路径缓存过期时间（秒）
     DEFAULT_MAX_RETRIES = 3         # 最大重试次数
     DEFAULT_JITTER_RATIO = 0.3      # 请求间隔随机抖动比例（±30%）
+    DEFAULT_LIST_WORKERS = 4        # 遍历分享子目录的并发数（请求间隔仍由速率限制器保证）
+    MISSING_PATH_TTL = 60           # 不存在路径的缓存时间（秒）
+    MISSING_PATH_CACHE_SIZE = 1024  # 不存在路径缓存的最大条目数
 
     def __init__(
         self,
@@ -216,16 +260,28 @@ class P115ClientManager:
         self.path_cache = PathCache(default_ttl=_path_cache_ttl)
         # 根目录始终缓存
         self.path_cache.set("/", 0)
+        # 确认不存在的路径（path -> 确认时间），只用于 mkdir=False 的查询
+        self._missing_paths: Dict[str, float] = {}
 
         # 分享信息缓存（URL -> {share_code, receive_code}）
         self._share_info_cache: Dict[str, Dict[str, str]] = {}
 
+        # 遍历分享目录共用的线程池（整个管理器只有这一个，线程数固定）
+        self._list_executor = ThreadPoolExecutor(
+            max_workers=self.DEFAULT_LIST_WORKERS,
+            thread_name_prefix="p115strgmsub-share"
+        )
+
         if P115_AVAILABLE and cookies:
             try:
                 self.client = P115Client(cookies, app="web")
             except Exception as e:
                 logger.error(f"初始化 P115Client 失败: {e}")
 
+    def close(self):
+        """关闭遍历分享目录的线程池，不等待正在执行的任务"""
+        self._list_executor.shutdown(wait=False)
+
     def _rate_limited_call(self, func: Callable, *args, **kwargs):
         """
         带速率限制的 API 调用封装
@@ -266,10 +322,7 @@ class P115ClientManager:
             return -1
 
         # 规范化路径
-        path = path.replace("\\", "/")
-        if not path.startswith("/"):
-            path = "/" + path
-        path = path.rstrip("/")
+        path = _normalize_path(path)
 
         # 根目录
         if not path or path == "/":
@@ -280,42 +333,67 @@ class P115ClientManager:
         if cached_cid is not None:
             return cached_cid
 
+        # 不创建时，近期已确认不存在的路径直接返回失败
+        if not mkdir:
+            missing_at = self._missing_paths.get(path)
+            if missing_at is not None:
+                if time.time() - missing_at <= self.MISSING_PATH_TTL:
+                    return -1
+                self._missing_paths.pop(path, None)
+
         # 尝试直接通过 API 获取完整路径
+        not_found = False
         try:
             self.rate_limiter.wait()
             self._api_call_count += 1
             resp = self.client.fs_dir_getid(path)
-            if resp.get("id"):
-                cid = int(resp["id"])
+            cid = int(resp.get("id") or 0)
+            if cid:
                 self.path_cache.set(path, cid)
                 return cid
+            # 只有接口正常返回（state 为真）且 id 为 0 才是目录不存在；
+            # state 为假多为风控、登录失效等错误，不能当作不存在缓存
+            not_found = bool(resp.get("state"))
+            if not not_found:
+                logger.info(f"直接获取路径 ID 失败 ({path}): {resp.get('error') or resp}")
         except Exception as e:
             logger.info(f"直接获取路径 ID 失败 ({path}): {e}")
 
-        # 如果不创建，则返回失败
+        # 如果不创建，则返回失败（仅缓存接口明确返回不存在的结果，请求异常不缓存）
         if not mkdir:
+            if not_found:
+                self._missing_paths.pop(path, None)
+                self._missing_paths[path] = time.time()
+                while len(self._missing_paths) > self.MISSING_PATH_CACHE_SIZE:
+                    self._missing_paths.pop(next(iter(self._missing_paths)), None)
             return -1
 
         # ===== 优化：创建模式下直接逐级创建，不再每层都先尝试获取 =====
         parts = [p for p in path.split("/") if p]
-        parent_id = 0
+        # 各级路径前缀只拼接一次，查找缓存和创建目录共用
+        prefixes = []
         current_path = ""
+        for part in parts:
+            current_path = f"{current_path}/{part}"
+            prefixes.append(current_path)
+            # 即将创建，清除不存在记录
+            self._missing_paths.pop(current_path, None)
+
+        parent_id = 0
         start_index = 0
 
-        # 找到最近的已缓存父目录
-        temp_path = ""
-        for i, part in enumerate(parts):
-            temp_path = f"{temp_path}/{part}"
-            temp_cid = self.path_cache.get(temp_path)
+        # 从最深一级向上找到最近的已缓存父目录，命中即停止
+        for i in range(len(prefixes) - 1, -1, -1):
+            temp_cid = self.path_cache.get(prefixes[i])
             if temp_cid is not None:
                 parent_id = temp_cid
-                current_path = temp_path
                 start_index = i + 1
+                break
 
         # 从未缓存的部分开始处理（优化：直接创建，不再先获取）
         for i in range(start_index, len(parts)):
             part = parts[i]
-            current_path = f"{current_path}/{part}"
+            current_path = prefixes[i]
 
             # 再次检查缓存（可能在并发中被设置）
             cached = self.path_cache.get(current_path)
@@ -528,11 +606,53 @@ class P115ClientManager:
             max_depth: int = 3,
             target_season: int = None
     ) -> List[dict]:
-        """递归列出分享文件（带速率限制和季数过滤优化）"""
+        """
+        逐层列出分享文件（带速率限制和季数过滤优化）
+        同一层的子目录提交到管理器共用的线程池并发列出，子目录之间仍串行插入随机延迟
+        """
         if depth > max_depth:
             return []
 
+        files, level = self._list_share_dir(share_code, receive_code, cid, depth, max_depth, target_season)
+
+        while level:
+            depth += 1
+            pending = []
+            for file_info, sub_cid in level:
+                # 进入子目录前增加随机延迟，避免频繁请求
+                if self.recursion_delay > 0:
+                    jitter = self.recursion_delay * 0.3  # ±30% 随机浮动
+                    time.sleep(self.recursion_delay + random.uniform(-jitter, jitter))
+
+                future = self._list_executor.submit(
+                    self._list_share_dir, share_code, receive_code, sub_cid, depth, max_depth, target_season
+                )
+                pending.append((file_info, future))
+
+            level = []
+            for file_info, future in pending:
+                children, sub_dirs = future.result()
+                file_info["children"] = children
+                level.extend(sub_dirs)
+
+        return files
+
+    def _list_share_dir(
+            self,
+            share_code: str,
+            receive_code: str,
+            cid: int,
+            depth: int,
+            max_depth: int,
+            target_season: int = None
+    ) -> Tuple[List[dict], List[Tuple[dict, int]]]:
+        """
+        列出分享中的单个目录
+
+        :return: (本层文件列表, 需要继续列出的子目录 [(目录信息, 目录 ID)])
+        """
         files = []
+        sub_dirs: List[Tuple[dict, int]] = []
         try:
             # 速率限制
             self.rate_limiter.wait()
@@ -556,7 +676,6 @@ class P115ClientManager:
                     "pick_code": item.get("pick_code", ""),
                 }
 
-                # 递归获取子目录内容（带随机延迟）
                 if file_info["is_dir"] and depth < max_depth:
                     dir_name = file_info["name"]
 
@@ -568,30 +687,14 @@ class P115ClientManager:
                             files.append(file_info)  # 仍然记录目录信息，但不递归
                             continue
 
-                    # 递归前增加随机延迟，避免频繁请求
-                    if self.recursion_delay > 0:
-                        import random
-                        jitter = self.recursion_delay * 0.3  # ±30% 随机浮动
-                        delay = self.recursion_delay + random.uniform(-jitter, jitter)
-                        time.sleep(delay)
-
-                    sub_cid = int(item.get("id", 0))
-                    children = self._list_share_files_recursive(
-                        share_code=share_code,
-                        receive_code=receive_code,
-                        cid=sub_cid,
-                        depth=depth + 1,
-                        max_depth=max_depth,
-                        target_season=target_season
-                    )
-                    file_info["children"] = children
+                    sub_dirs.append((file_info, int(item.get("id", 0))))
 
                 files.append(file_info)
 
         except Exception as e:
             logger.error(f"列出分享文件失败: {e}")
 
-        return files
+        return files, sub_dirs
 
     def _should_skip_season_dir(self, dir_name: str, target_season: int) -> bool:
         """
@@ -601,27 +704,13 @@ class P115ClientManager:
         :param target_season: 目标季数
         :return: True 表示应跳过，False 表示需要递归
         """
-        import re
-
-        # 常见的季数目录命名模式
-        patterns = [
-            r'[Ss]eason\s*(\d+)',      # Season 1, season1
-            r'[Ss](\d+)',              # S1, s01
-            r'第(\d+)季',              # 第1季
-            r'第([一二三四五六七八九十]+)季',  # 第一季
-        ]
-
-        # 中文数字映射
-        cn_num_map = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
-                      '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
-
-        for pattern in patterns:
-            match = re.search(pattern, dir_name)
+        for pattern in _SEASON_DIR_PATTERNS:
+            match = pattern.search(dir_name)
             if match:
                 season_str = match.group(1)
                 # 转换中文数字
-                if season_str in cn_num_map:
-                    found_season = cn_num_map[season_str]
+                if season_str in _CN_NUM_MAP:
+                    found_season = _CN_NUM_MAP[season_str]
                 else:
                     try:
                         found_season = int(season_str)
@@ -798,7 +887,6 @@ class P115ClientManager:
 
             # 批次之间添加间隔，避免触发风控
             if batch_index + batch_size < len(file_ids):
-                import random
                 jitter = batch_interval * 0.3
                 actual_interval = batch_interval + random.uniform(-jitter, jitter)
                 logger.info(f"批次间隔 {actual_interval:.1f} 秒")
@@ -856,12 +944,12 @@ class P115ClientManager:
                     error_code = resp.get("errno", resp.get("errcode", 0))
 
                     # 检查是否是重复文件
-                    if "重复" in error_msg or "已存在" in error_msg:
+                    if _DUPLICATE_RE.search(error_msg):
                         logger.info(f"文件已存在，跳过: {file_id}")
                         return True
 
                     # 检查是否是可重试的错误（如限流）
-                    if error_code in (990001, 990002, 990009):  # 常见的限流错误码
+                    if error_code in _RATE_LIMIT_ERRNOS:
                         if attempt < max_retries:
                             wait_time = (attempt + 1) * 2  # 递增等待时间
                             logger.warning(f"遇到限流，{wait_time}秒后重试 (尝试 {attempt + 1}/{max_retries + 1})")
@@ -883,11 +971,12 @@ class P115ClientManager:
 
         return False
 
-    def list_files(self, path: str) -> List[dict]:
+    def list_files(self, path: str, dirs_only: bool = False) -> List[dict]:
         """
         列出指定路径下的文件
 
         :param path: 目录路径
+        :param dirs_only: 是否只返回目录（由服务端过滤，不下载文件条目）
         :return: 文件列表
         """
         if not self.client:
@@ -900,7 +989,11 @@ class P115ClientManager:
         try:
             self.rate_limiter.wait()
             self._api_call_count += 1
-            resp = self.client.fs_files({"cid": cid, "limit": 1000})
+            payload = {"cid": cid, "limit": 1000}
+            if dirs_only:
+                # nf=1：不返回文件，仅返回目录（需要 show_dir=1）
+                payload.update({"show_dir": 1, "nf": 1})
+            resp = self.client.fs_files(payload)
             if resp.get("state"):
                 return resp.get("data", [])
             return []
@@ -915,17 +1008,17 @@ class P115ClientManager:
         :param path: 目录路径
         :return: 目录列表，每个目录包含 name 和 path 字段
         """
-        files = self.list_files(path)
+        # 子目录路径前缀只计算一次
+        prefix = "" if path == "/" else path.rstrip("/")
 
-        # 过滤出目录（fid=0 表示目录）
+        # 服务端已只返回目录，这里仍按 fid=0 过滤兜底
         directories = []
-        for f in files:
+        for f in self.list_files(path, dirs_only=True):
             if f.get("fid") == 0:  # 是目录
                 dir_name = f.get("name", "")
-                dir_path = f"{path.rstrip('/')}/{dir_name}" if path != "/" else f"/{dir_name}"
                 directories.append({
                     "name": dir_name,
-                    "path": dir_path,
+                    "path": f"{prefix}/{dir_name}",
                     "cid": f.get("cid", 0)
                 })
 
@@ -935,6 +1028,7 @@ class P115ClientManager:
         """清空路径缓存"""
         self.path_cache.clear()
         self.path_cache.set("/", 0)
+        self._missing_paths.clear()
 
     def clear_share_cache(self):
         """清空分享信息缓存"""
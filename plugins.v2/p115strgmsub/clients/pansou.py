@@ -2,14 +2,24 @@
 PanSou 网盘搜索客户端
 用于搜索各类网盘资源
 """
+import copy
 import re
+import threading
+import time
 import unicodedata
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from operator import itemgetter
+from typing import Optional, List, Dict, Any, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.log import logger
+try:
+    # orjson 直接解析 bytes，省去先解码为 str 的开销
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 
 class PanSouClient:
@@ -32,6 +42,18 @@ class PanSouClient:
     }
 
     _PUNCT_GAP_RE = re.compile(r"[\s\u3000:：·•.,，。!！?？（）【】\[\]/／\\＼-]+")
+    _HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+    # Token 默认有效期与提前刷新时间（秒）
+    TOKEN_DEFAULT_TTL = 24 * 3600
+    TOKEN_REFRESH_AHEAD = 5 * 60
+
+    # 搜索响应体大小上限（字节），超出视为异常响应
+    MAX_RESPONSE_SIZE = 8 * 1024 * 1024
+
+    # 搜索结果缓存有效期（秒）与最大条目数
+    SEARCH_CACHE_TTL = 300
+    SEARCH_CACHE_SIZE = 128
 
     def __init__(
             self,
@@ -55,15 +77,60 @@ class PanSouClient:
         self.password = password
         self.auth_enabled = auth_enabled
         self._token: Optional[str] = None
-        self._token_expires: Optional[datetime] = None
+        # Token 过期时间（time.monotonic 时间轴，不受系统时间调整影响）
+        self._token_expires_mono: Optional[float] = None
+        # 登录互斥锁：后台刷新与过期后的同步登录共用，同一时间只发送一个登录请求
+        self._refresh_lock = threading.Lock()
         # API 调用计数器
         self._api_call_count = 0
+        # 复用连接的会话，Token 刷新和搜索共用同一个长连接，避免每次请求重新握手
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+                raise_on_status=False
+            )
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # 搜索结果缓存：(关键词, 网盘类型, 频道, 数量限制) -> (搜索结果, 缓存时间)
+        self._search_cache: Dict[Tuple, Tuple[Dict[str, Any], float]] = {}
+        self._cache_lock = threading.Lock()
         # 代理设置（兼容字符串和字典格式）
         if proxy:
             self._proxies = proxy if isinstance(proxy, dict) else {"http": proxy, "https": proxy}
         else:
             self._proxies = None
 
+    def _get_cached_result(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """获取缓存的搜索结果副本，不存在或已过期时返回 None"""
+        with self._cache_lock:
+            cached = self._search_cache.get(key)
+            if not cached:
+                return None
+            result, timestamp = cached
+            if time.time() - timestamp > self.SEARCH_CACHE_TTL:
+                del self._search_cache[key]
+                return None
+        return copy.deepcopy(result)
+
+    def _set_cached_result(self, key: Tuple, result: Dict[str, Any]):
+        """缓存搜索结果，超出容量时淘汰最早写入的条目"""
+        with self._cache_lock:
+            self._search_cache.pop(key, None)
+            self._search_cache[key] = (copy.deepcopy(result), time.time())
+            while len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+                del self._search_cache[next(iter(self._search_cache))]
+
+    def clear_cache(self):
+        """清空搜索结果缓存"""
+        with self._cache_lock:
+            self._search_cache.clear()
+
     @staticmethod
     def _normalize_for_match(text: str) -> str:
         """
@@ -129,17 +196,41 @@ class PanSouClient:
             logger.warning("PanSou 认证已启用但未配置用户名密码")
             return None
 
-        # 检查 Token 是否有效（提前 5 分钟刷新）
-        now = datetime.now()
-        if self._token and self._token_expires:
-            if now < self._token_expires - timedelta(minutes=5):
+        # 检查 Token 是否有效（提前 5 分钟在后台刷新）
+        if self._token and self._token_expires_mono:
+            remaining = self._token_expires_mono - time.monotonic()
+            if remaining > self.TOKEN_REFRESH_AHEAD:
                 return self._token
+            if remaining > 0:
+                # 即将过期：继续使用当前 Token，同时在后台登录换新，不阻塞本次请求
+                if self._refresh_lock.acquire(blocking=False):
+                    threading.Thread(
+                        target=self._refresh_token_background,
+                        name="p115strgmsub-pansou-token",
+                        daemon=True
+                    ).start()
+                return self._token
+
+        # Token 不存在或已过期：与后台刷新共用同一把锁串行登录，拿到锁后再检查一次，
+        # 若其他线程已完成登录则直接复用，避免并发请求各自发送登录请求
+        with self._refresh_lock:
+            if self._token and self._token_expires_mono and time.monotonic() < self._token_expires_mono:
+                return self._token
+            return self._login()
+
+    def _refresh_token_background(self):
+        """后台刷新 Token"""
+        try:
+            self._login()
+        finally:
+            self._refresh_lock.release()
 
-        # 登录获取新 Token
+    def _login(self) -> Optional[str]:
+        """登录获取新 Token"""
         try:
             login_url = f"{self.base_url}/api/auth/login"
             self._api_call_count += 1
-            response = requests.post(
+            response = self._session.post(
                 login_url,
                 json={"username": self.username, "password": self.password},
                 timeout=10,
@@ -150,10 +241,9 @@ class PanSouClient:
                 data = response.json()
                 self._token = data.get("token")
                 expires_at = data.get("expires_at")
-                if expires_at:
-                    self._token_expires = datetime.fromtimestamp(expires_at)
-                else:
-                    self._token_expires = now + timedelta(hours=24)
+                # 服务端返回的是 Unix 时间戳，换算成剩余秒数后落到 monotonic 时间轴上
+                ttl = expires_at - time.time() if expires_at else self.TOKEN_DEFAULT_TTL
+                self._token_expires_mono = time.monotonic() + ttl
                 logger.debug("PanSou Token 获取成功")
                 return self._token
             else:
@@ -164,6 +254,26 @@ class PanSouClient:
             logger.error(f"PanSou 登录失败: {e}")
             return None
 
+    def _read_limited(self, response: requests.Response) -> Optional[bytes]:
+        """
+        分块读取响应内容，超过 MAX_RESPONSE_SIZE 时中止
+
+        :param response: 以 stream=True 发起的响应
+        :return: 响应内容，超出大小上限时返回 None
+        """
+        chunks = []
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size=65536):
+                size += len(chunk)
+                if size > self.MAX_RESPONSE_SIZE:
+                    logger.warning(f"PanSou 响应超过 {self.MAX_RESPONSE_SIZE // (1024 * 1024)} MiB，已中止读取")
+                    return None
+                chunks.append(chunk)
+        finally:
+            response.close()
+        return b"".join(chunks)
+
     def search(
             self,
             keyword: str,
@@ -199,6 +309,18 @@ class PanSouClient:
         except (ValueError, TypeError):
             limit = 10
 
+        # 短时间内的相同搜索直接使用缓存结果
+        cache_key = (
+            keyword,
+            tuple(sorted(cloud_types or ())),
+            tuple(sorted(channels or ())),
+            limit
+        )
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result is not None:
+            logger.debug(f"PanSou 使用缓存的搜索结果: {keyword}")
+            return cached_result
+
         try:
             headers = {"Content-Type": "application/json"}
 
@@ -227,27 +349,39 @@ class PanSouClient:
 
             logger.info(f"PanSou 搜索: {payload}")
             self._api_call_count += 1
-            response = requests.post(search_url, json=payload, headers=headers, timeout=120, proxies=self._proxies)
-          
+            # 连接超时 10 秒；读取超时保持 120 秒（refresh 搜索需要等待上游聚合）
+            response = self._session.post(
+                search_url, json=payload, headers=headers, timeout=(10, 120), stream=True, proxies=self._proxies
+            )
 
             # Token 失效重试
             if response.status_code == 401 and self.auth_enabled:
+                response.close()
                 self._token = None
-                self._token_expires = None
+                self._token_expires_mono = None
 
                 token = self._get_token()
                 if token:
                     headers["Authorization"] = f"Bearer {token}"
                     self._api_call_count += 1
-                    response = requests.post(search_url, json=payload, headers=headers, timeout=30, proxies=self._proxies)
+                    response = self._session.post(
+                        search_url, json=payload, headers=headers, timeout=(10, 30), stream=True, proxies=self._proxies
+                    )
 
             if response.status_code != 200:
+                response.close()
                 return {
                     "error": f"搜索请求失败: HTTP {response.status_code}",
                     "keyword": keyword
                 }
 
-            resp_data = response.json()
+            content = self._read_limited(response)
+            if content is None:
+                return {
+                    "error": "搜索响应过大，已放弃解析",
+                    "keyword": keyword
+                }
+            resp_data = json_loads(content)
 
             # 检查响应状态码
             if resp_data.get("code") != 0:
@@ -263,11 +397,19 @@ class PanSouClient:
 
             # 按网盘类型分组
             grouped_results = {}
+            # 指定了网盘类型时，所有类型都已取满即可停止处理剩余结果
+            type_name = self.TYPE_NAMES.get
+            needed_types = {type_name(t, t) for t in cloud_types} if cloud_types else None
+            full_types = set()
 
             for item in results_list:
+                if needed_types and full_types >= needed_types:
+                    break
+
                 title = item.get("title", "")
-                # 清理 title 中的 HTML 标签
-                title = re.sub(r'<[^>]+>', '', title)
+                # 清理 title 中的 HTML 标签（不含 < 的标题无需走正则）
+                if "<" in title:
+                    title = self._HTML_TAG_RE.sub("", title)
 
                 if not self._title_matches_search_key(keyword, title):
                     continue
@@ -277,13 +419,12 @@ class PanSouClient:
 
                 for link in links:
                     pan_type = link.get("type", "unknown")
-                    type_display = self.TYPE_NAMES.get(pan_type, pan_type)
+                    type_display = type_name(pan_type, pan_type)
 
-                    if type_display not in grouped_results:
-                        grouped_results[type_display] = []
+                    type_results = grouped_results.setdefault(type_display, [])
 
                     # 限制每种类型的数量
-                    if len(grouped_results[type_display]) >= limit:
+                    if len(type_results) >= limit:
                         continue
 
                     link_item = {
@@ -297,24 +438,28 @@ class PanSouClient:
                     if pwd:
                         link_item["password"] = pwd
 
-                    grouped_results[type_display].append(link_item)
+                    type_results.append(link_item)
+                    if len(type_results) >= limit:
+                        full_types.add(type_display)
 
-            # 按时间倒序排序
-            for pan_type in grouped_results:
-                grouped_results[pan_type].sort(
-                    key=lambda x: x.get("update_time", ""),
-                    reverse=True
-                )
+            # 按时间倒序排序（每个条目都带有 update_time 字段）
+            sort_key = itemgetter("update_time")
+            for type_results in grouped_results.values():
+                type_results.sort(key=sort_key, reverse=True)
 
             # 计算总数
             total_count = sum(len(v) for v in grouped_results.values())
 
-            return {
+            result = {
                 "keyword": keyword,
                 "total": total,
                 "count": total_count,
                 "results": grouped_results
             }
+            # 空结果不缓存：上游 refresh 聚合可能稍后才出现资源
+            if total_count > 0:
+                self._set_cached_result(cache_key, result)
+            return result
 
         except requests.exceptions.Timeout:
             return {
@@ -344,6 +489,10 @@ class PanSouClient:
 
         return result.get("results", {}).get("115网盘", [])
 
+    def close(self):
+        """关闭会话，释放连接"""
+        self._session.close()
+
     def get_api_call_count(self) -> int:
         """获取 API 调用次数"""
         return self._api_call_count
@@ -2,7 +2,7 @@
 搜索处理模块
 负责所有搜索相关逻辑：HDHive、Nullbr、PanSou
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 from app.core.config import settings
 from app.log import logger
@@ -99,6 +99,24 @@ class SearchHandler:
 
         return sources
 
+    def prefetch_nullbr(self, items: List[Tuple[MediaType, int]]):
+        """
+        并发预取一批订阅的 Nullbr 资源，后续逐个订阅查询时直接命中客户端缓存
+
+        :param items: [(媒体类型, TMDB ID), ...]
+        """
+        if not (self._nullbr_enabled and self._nullbr_client):
+            return
+        queries = [
+            ("movie" if media_type == MediaType.MOVIE else "tv", tmdb_id)
+            for media_type, tmdb_id in items
+            if tmdb_id
+        ]
+        if not queries:
+            return
+        logger.info(f"Nullbr 预取 {len(queries)} 个订阅的资源")
+        self._nullbr_client.get_many(queries)
+
     def search_resources(
         self,
         mediainfo: MediaInfo,
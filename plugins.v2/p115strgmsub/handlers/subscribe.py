@@ -2,14 +2,16 @@
 订阅处理模块
 负责订阅状态检查、完成、站点更新等逻辑（v1.2.5）
 """
-from typing import List, Callable, Dict, Any
-from sqlalchemy import text
+import traceback
+from typing import List, Callable, Dict, Optional
+from sqlalchemy import bindparam, text, update
 
 from app.core.metainfo import MetaInfo
 from app.chain.subscribe import SubscribeChain
 from app.db import SessionFactory
 from app.db.subscribe_oper import SubscribeOper
 from app.db.models.site import Site
+from app.db.models.subscribe import Subscribe
 from app.log import logger
 from app.schemas import MediaInfo
 from app.schemas.types import MediaType, NotificationType
@@ -24,9 +26,13 @@ class SubscribeHandler:
         notify: bool = False,
         post_message_func: Callable = None
     ):
-        self._exclude_subscribes = exclude_subscribes or []
+        self._exclude_subscribes = frozenset(exclude_subscribes or [])
         self._notify = notify
         self._post_message = post_message_func
+        # 订阅 sites 字段存储格式缓存（"str" / "list"）
+        self._sites_storage_fmt: Optional[str] = None
+        # 数据库操作对象复用，避免每次更新都重新创建
+        self._subscribe_oper = SubscribeOper()
 
     # ------------------ 订阅完成逻辑（完整保留） ------------------
 
@@ -42,9 +48,17 @@ class SubscribeHandler:
         try:
             current_note = subscribe.note or []
             if mediainfo.type == MediaType.TV:
-                new_note = list(set(current_note).union(set(success_episodes)))
+                # 全程使用同一个集合，仅在写库时转换一次
+                new_note_set = set(current_note)
+                note_count = len(new_note_set)
+                new_note_set.update(success_episodes)
+                note_changed = len(new_note_set) != note_count
+                new_note = sorted(new_note_set) if note_changed else current_note
             else:
-                new_note = list(set(current_note).union({1}))
+                # 电影只记录第1集，已记录时无需构造集合
+                new_note_set = None
+                note_changed = 1 not in current_note
+                new_note = [*current_note, 1] if note_changed else current_note
 
             current_lack = subscribe.lack_episode or 0
             total_episode = subscribe.total_episode or 0
@@ -52,14 +66,13 @@ class SubscribeHandler:
 
             if mediainfo.type == MediaType.TV and total_episode > 0:
                 expected_episodes = set(range(start_episode, total_episode + 1))
-                downloaded_episodes = set(new_note)
-                remaining_episodes = expected_episodes - downloaded_episodes
+                remaining_episodes = expected_episodes - new_note_set
                 new_lack = len(remaining_episodes)
             else:
                 new_lack = max(0, current_lack - len(success_episodes))
 
             update_data = {}
-            if new_note != current_note:
+            if note_changed:
                 update_data["note"] = new_note
                 logger.info(f"更新订阅 {subscribe.name} note：{current_note} -> {new_note}")
             if new_lack != current_lack:
@@ -67,7 +80,7 @@ class SubscribeHandler:
                 logger.info(f"更新订阅 {subscribe.name} 缺失集数：{current_lack} -> {new_lack}")
 
             if update_data:
-                SubscribeOper().update(subscribe.id, update_data)
+                self._subscribe_oper.update(subscribe.id, update_data)
 
             if new_lack == 0:
                 logger.info(f"订阅 {subscribe.name} 已完成，准备移至历史记录")
@@ -81,6 +94,12 @@ class SubscribeHandler:
                     logger.error(f'订阅 {subscribe.name} 类型错误：{subscribe.type}')
                     return
 
+                # 通知内容在完成订阅前准备好，未开启通知时不做任何格式化
+                notify_text = None
+                if self._notify and self._post_message is not None:
+                    season_text = f" 第{subscribe.season}季" if subscribe.type == MediaType.TV.value and subscribe.season else ""
+                    notify_text = f"{subscribe.name}{season_text} 已完成，订阅已移至历史记录。"
+
                 try:
                     SubscribeChain().finish_subscribe_or_not(
                         subscribe=subscribe,
@@ -91,22 +110,19 @@ class SubscribeHandler:
                         force=True
                     )
                     logger.info(f"订阅 {subscribe.name} 已移至历史记录")
-                    if self._notify and self._post_message:
-                        season_text = f" 第{subscribe.season}季" if subscribe.type == MediaType.TV.value and subscribe.season else ""
+                    if notify_text:
                         self._post_message(
                             mtype=NotificationType.Plugin,
                             title="【115网盘订阅追更】订阅完成",
-                            text=f"{subscribe.name}{season_text} 已完成，订阅已移至历史记录。"
+                            text=notify_text
                         )
                 except Exception as e:
-                    import traceback
                     logger.error(
                         f"完成订阅时出错 - 订阅ID:{subscribe.id} 名称:{subscribe.name} "
                         f"异常:{type(e).__name__}:{e}\n{traceback.format_exc()}"
                     )
 
         except Exception as e:
-            import traceback
             logger.error(
                 f"检查订阅完成状态出错 - 订阅ID:{getattr(subscribe, 'id', None)} 名称:{getattr(subscribe, 'name', None)} "
                 f"异常:{type(e).__name__}:{e}\n{traceback.format_exc()}"
@@ -125,11 +141,21 @@ class SubscribeHandler:
 
     @staticmethod
     def _get_site_ids_by_names(db, site_names: List[str]) -> Dict[str, int]:
+        if not site_names:
+            return {}
+        # 单条 IN 查询代替逐个名称查询
+        stmt = text("SELECT id, name FROM site WHERE name IN :names").bindparams(
+            bindparam("names", expanding=True)
+        )
+        found: Dict[str, int] = {}
+        for row in db.execute(stmt, {"names": list(site_names)}).fetchall():
+            if row[0] is not None and row[1] not in found:
+                found[row[1]] = int(row[0])
+
         mapping: Dict[str, int] = {}
         for name in site_names:
-            row = db.execute(text("SELECT id FROM site WHERE name=:name LIMIT 1"), {"name": name}).fetchone()
-            if row and row[0] is not None:
-                mapping[name] = int(row[0])
+            if name in found:
+                mapping[name] = found[name]
             else:
                 logger.warning(f"未找到站点记录：name={name}（将跳过）")
         return mapping
@@ -153,18 +179,47 @@ class SubscribeHandler:
                     "limit_interval": 10000000, "limit_count": 1, "limit_seconds": 10000000, "timeout": 1
                 }
             )
-            db.commit()
             logger.info("已添加站点记录：115网盘(id=-1)")
         return -1
 
     @staticmethod
-    def _guess_sites_storage_format_from_rows(rows: List[Any]) -> str:
-        for v in rows:
-            if isinstance(v, str):
-                return "str"
-            if isinstance(v, list):
-                return "list"
-        return "list"
+    def _list_subscribe_ids(db) -> List[int]:
+        """仅查询全部订阅ID"""
+        rows = db.execute(text("SELECT id FROM subscribe")).fetchall()
+        return [int(r[0]) for r in rows]
+
+    @staticmethod
+    def _bulk_update_sites(db, subscribe_ids: List[int], value) -> int:
+        """
+        批量写入订阅 sites 字段（单条语句 executemany，由调用方统一提交）
+        """
+        if not subscribe_ids:
+            return 0
+        table = Subscribe.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(sites=bindparam("b_sites", type_=table.c.sites.type))
+        )
+        db.execute(stmt, [{"b_id": sid, "b_sites": value} for sid in subscribe_ids])
+        return len(subscribe_ids)
+
+    def _get_storage_fmt(self, db) -> str:
+        """
+        获取订阅 sites 字段存储格式，判断成功后缓存到实例上
+        只取一行 sites 列，并经由 ORM 列类型转换，避免 SQLite 中 JSON 字段被误判为字符串
+        """
+        if self._sites_storage_fmt is not None:
+            return self._sites_storage_fmt
+        row = db.query(Subscribe.sites).limit(1).first()
+        sites = row[0] if row else None
+        if isinstance(sites, str):
+            self._sites_storage_fmt = "str"
+        elif isinstance(sites, list):
+            self._sites_storage_fmt = "list"
+        else:
+            return "list"
+        return self._sites_storage_fmt
 
     @staticmethod
     def _guess_sites_storage_format_for_subscribe(db, subscribe_id: int) -> str:
@@ -184,7 +239,6 @@ class SubscribeHandler:
 
     def apply_subscribe_sites_by_site_names(self, site_names: List[str], action_desc: str = "") -> List[int]:
         action_desc = action_desc or f"设置订阅sites={site_names}"
-        exclude_ids = set(self._exclude_subscribes or [])
         site_names_norm = self._normalize_site_names(site_names)
 
         if not site_names_norm:
@@ -193,18 +247,8 @@ class SubscribeHandler:
 
         with SessionFactory() as db:
             mapping = self._get_site_ids_by_names(db, site_names_norm)
-            site_ids = []
-            for nm in site_names_norm:
-                if nm in mapping:
-                    site_ids.append(mapping[nm])
-
-            seen = set()
-            site_ids_uniq = []
-            for x in site_ids:
-                if x in seen:
-                    continue
-                seen.add(x)
-                site_ids_uniq.append(x)
+            # 按站点名称顺序去重
+            site_ids_uniq = list(dict.fromkeys(mapping[nm] for nm in site_names_norm if nm in mapping))
 
             logger.info(f"{action_desc}：站点映射 name->id = {mapping}")
             logger.info(f"{action_desc}：最终写入 sites = {site_ids_uniq}")
@@ -213,29 +257,42 @@ class SubscribeHandler:
                 logger.warning(f"{action_desc}：未解析到有效站点ID，跳过写入（保持原状）")
                 return []
 
-            # 复用 SubscribeOper 实例，避免循环中重复创建
-            subscribe_oper = SubscribeOper(db=db)
-            subscribes = subscribe_oper.list() or []
-            sample_sites = []
-            for s in subscribes[:5]:
-                try:
-                    sample_sites.append(getattr(s, "sites", None))
-                except Exception:
-                    pass
-            storage = self._guess_sites_storage_format_from_rows(sample_sites)
-
-            updated, excluded = 0, 0
-            for s in subscribes:
-                if s.id in exclude_ids:
-                    excluded += 1
-                    continue
-                value = ",".join(str(x) for x in site_ids_uniq) if storage == "str" else site_ids_uniq
-                subscribe_oper.update(s.id, {"sites": value})
-                updated += 1
-
-            logger.info(f"{action_desc}：已更新 {updated} 个订阅（跳过 {excluded} 个排除订阅）")
+            self._write_sites_to_all(db, site_ids_uniq, action_desc)
             return site_ids_uniq
 
+    def _write_sites_to_all(self, db, site_ids: List[int], action_desc: str):
+        """
+        将站点ID写入全部非排除订阅（单条批量语句，统一提交一次）
+        """
+        storage = self._get_storage_fmt(db)
+
+        # 仅取订阅ID，无需加载完整 ORM 对象
+        subscribe_ids = self._list_subscribe_ids(db)
+        target_ids = [sid for sid in subscribe_ids if sid not in self._exclude_subscribes]
+        excluded = len(subscribe_ids) - len(target_ids)
+        value = ",".join(str(x) for x in site_ids) if storage == "str" else list(site_ids)
+        updated = self._bulk_update_sites(db, target_ids, value)
+        db.commit()
+
+        logger.info(f"{action_desc}：已更新 {updated} 个订阅（跳过 {excluded} 个排除订阅）")
+
+    def apply_subscribe_sites_by_ids(self, site_ids: List[int], action_desc: str = "") -> List[int]:
+        """
+        按站点ID设置全部非排除订阅的 sites 字段
+
+        :param site_ids: 站点ID列表
+        :param action_desc: 日志描述
+        :return: 写入的站点ID列表
+        """
+        action_desc = action_desc or f"设置订阅sites={site_ids}"
+        if not site_ids:
+            logger.warning(f"{action_desc}：站点列表为空，跳过")
+            return []
+
+        with SessionFactory() as db:
+            self._write_sites_to_all(db, site_ids, action_desc)
+        return site_ids
+
     def set_unblocked_sites(self, unblocked_site_names: List[str]) -> List[int]:
         return self.apply_subscribe_sites_by_site_names(
             unblocked_site_names,
@@ -245,29 +302,7 @@ class SubscribeHandler:
     def set_blocked_sites_only_115(self) -> List[int]:
         with SessionFactory() as db:
             site_id_115 = self._ensure_115_site_id(db)
-
-            # 复用 SubscribeOper 实例，避免循环中重复创建
-            subscribe_oper = SubscribeOper(db=db)
-            subscribes = subscribe_oper.list() or []
-            sample_sites = []
-            for s in subscribes[:5]:
-                try:
-                    sample_sites.append(getattr(s, "sites", None))
-                except Exception:
-                    pass
-            storage = self._guess_sites_storage_format_from_rows(sample_sites)
-
-            exclude_ids = set(self._exclude_subscribes or [])
-            updated, excluded = 0, 0
-            for s in subscribes:
-                if s.id in exclude_ids:
-                    excluded += 1
-                    continue
-                value = str(site_id_115) if storage == "str" else [site_id_115]
-                subscribe_oper.update(s.id, {"sites": value})
-                updated += 1
-
-            logger.info(f"已屏蔽系统订阅：全量订阅仅115网盘（已更新 {updated} 个，跳过 {excluded} 个排除订阅）")
+            self._write_sites_to_all(db, [site_id_115], "已屏蔽系统订阅：全量订阅仅115网盘")
             return [site_id_115]
 
     # ------------------ 新增订阅站点写入（事件兜底用） ------------------
@@ -279,6 +314,8 @@ class SubscribeHandler:
         """
         with SessionFactory() as db:
             site_id_115 = self._ensure_115_site_id(db)
+            # 先提交可能新建的 115 站点；订阅不存在时 SubscribeOper.update 不会提交，站点插入会随会话关闭丢失
+            db.commit()
             storage = self._guess_sites_storage_format_for_subscribe(db, int(subscribe_id))
             value = str(site_id_115) if storage == "str" else [site_id_115]
             SubscribeOper(db=db).update(int(subscribe_id), {"sites": value})
@@ -297,18 +334,8 @@ class SubscribeHandler:
 
         with SessionFactory() as db:
             mapping = self._get_site_ids_by_names(db, site_names_norm)
-            site_ids = []
-            for nm in site_names_norm:
-                if nm in mapping:
-                    site_ids.append(mapping[nm])
-
-            seen = set()
-            site_ids_uniq = []
-            for x in site_ids:
-                if x in seen:
-                    continue
-                seen.add(x)
-                site_ids_uniq.append(x)
+            # 按站点名称顺序去重
+            site_ids_uniq = list(dict.fromkeys(mapping[nm] for nm in site_names_norm if nm in mapping))
 
             if not site_ids_uniq:
                 logger.warning(f"已恢复系统订阅：新增订阅未解析到站点ID（subscribe_id={subscribe_id}），跳过")
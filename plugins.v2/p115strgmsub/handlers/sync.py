@@ -2,8 +2,15 @@
 同步处理模块
 负责核心的同步逻辑：处理电影订阅、处理电视剧订阅
 """
+import copy
 import datetime
-from typing import List, Dict, Any, Set, Optional, Callable
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Set, Optional, Callable, Deque, Iterator, Tuple
 
 from app.core.config import global_vars
 from app.core.metainfo import MetaInfo
@@ -20,10 +27,18 @@ from ..utils import FileMatcher, SubscribeFilter
 from .search import SearchHandler
 from .subscribe import SubscribeHandler
 
+# 转存通知的消息类型
+_PLUGIN_NTYPE = NotificationType.Plugin
+
 
 class SyncHandler:
     """同步处理器"""
 
+    # 网盘已存在集数缓存有效期（秒）
+    _EXISTING_CLOUD_CACHE_TTL = 60
+    # Nullbr 每次预取的订阅数（按处理顺序分批预取，达到转存上限后不再预取）
+    NULLBR_PREFETCH_WINDOW = 8
+
     def __init__(
         self,
         p115_manager,
@@ -38,7 +53,8 @@ class SyncHandler:
         notify: bool = False,
         post_message_func: Callable = None,
         get_data_func: Callable = None,
-        save_data_func: Callable = None
+        save_data_func: Callable = None,
+        share_prefetch_concurrency: int = 4
     ):
         """
         初始化同步处理器
@@ -56,6 +72,7 @@ class SyncHandler:
         :param post_message_func: 发送消息的函数
         :param get_data_func: 获取数据的函数
         :param save_data_func: 保存数据的函数
+        :param share_prefetch_concurrency: 分享预取并发数（有效性检查 + 文件列表），<=1 时不预取
         """
         self._p115_manager = p115_manager
         self._search_handler = search_handler
@@ -70,13 +87,298 @@ class SyncHandler:
         self._post_message = post_message_func
         self._get_data = get_data_func
         self._save_data = save_data_func
+        self._share_prefetch_concurrency = max(1, int(share_prefetch_concurrency or 1))
+        # 数据库操作对象复用，避免每条记录都重新创建
+        self._downloadhistory_oper = DownloadHistoryOper()
+        self._subscribe_oper = SubscribeOper()
+        # 下载历史后台写入队列，数据库写入不阻塞转存流程
+        self._history_queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._history_writer: Optional[threading.Thread] = None
+        # 单次同步内的分享缓存，多个订阅搜到同一分享时不重复请求 115
+        self._share_status_cache: Dict[str, Any] = {}
+        self._share_files_cache: Dict[Tuple[str, Optional[int]], List[dict]] = {}
+        # 单次同步内的订阅名称解析缓存：名称 -> MetaInfo
+        self._meta_cache: Dict[str, MetaInfo] = {}
+        # 单次同步内的媒体识别缓存：(类型, tmdbid, doubanid, 名称, 年份, 季号) -> MediaInfo
+        self._recognize_cache: Dict[tuple, MediaInfo] = {}
+        # 网盘目录已存在集数缓存：save_dir -> (缓存时间, 集数集合)
+        self._existing_cloud_cache: Dict[str, Tuple[float, Set[int]]] = {}
+
+    @staticmethod
+    def _history_key(item: dict) -> tuple:
+        """历史记录索引键：电影按 (类型, 标题)，电视剧按 (类型, 标题, 季)"""
+        if item.get("type") == "电影":
+            return "电影", item.get("title")
+        return "电视剧", item.get("title"), item.get("season")
+
+    @staticmethod
+    def index_history(history: List[dict]) -> Dict[tuple, List[dict]]:
+        """
+        为成功的历史记录建立索引，避免每个订阅都线性扫描全部历史
+
+        :param history: 历史记录列表
+        :return: {索引键: [历史记录, ...]}
+        """
+        history_index: Dict[tuple, List[dict]] = {}
+        for h in history:
+            if h.get("status") == "成功":
+                history_index.setdefault(SyncHandler._history_key(h), []).append(h)
+        return history_index
+
+    @staticmethod
+    def _extend_history(history: List[dict], history_index: Dict[tuple, List[dict]], items: List[dict]):
+        """批量追加历史记录并同步更新索引"""
+        history.extend(items)
+        for item in items:
+            if item.get("status") == "成功":
+                history_index.setdefault(SyncHandler._history_key(item), []).append(item)
+
+    @staticmethod
+    def _movie_history_state(sub_name: str, history_index: Dict[tuple, List[dict]]) -> Tuple[int, bool]:
+        """
+        获取电影订阅的历史转存状态
+
+        :param sub_name: 订阅名称
+        :param history_index: 历史记录索引
+        :return: (最高历史分数, 该记录是否完美匹配)，分数 -1 表示未转存过
+        """
+        movie_history_score = -1
+        movie_perfect_match = False
+        for h in history_index.get(("电影", sub_name), ()):
+            score = h.get("filter_score", 0)
+            if score > movie_history_score:
+                movie_history_score = score
+                movie_perfect_match = h.get("perfect_match", False)
+        return movie_history_score, movie_perfect_match
+
+    def _needs_search(self, subscribe, history_index: Dict[tuple, List[dict]]) -> bool:
+        """
+        判断订阅本次同步是否还需要搜索资源，与 process_*_subscribe 开头的跳过规则保持一致
+
+        :param subscribe: 订阅对象
+        :param history_index: 历史记录索引
+        :return: 是否需要搜索
+        """
+        if subscribe.type == MediaType.TV.value:
+            return subscribe.lack_episode != 0
+        score, perfect = self._movie_history_state(subscribe.name, history_index)
+        return score < 0 or (bool(subscribe.best_version) and not perfect)
+
+    def prefetch_nullbr_window(
+        self,
+        subscribes: List[Any],
+        media_type: MediaType,
+        exclude_ids: Set[int],
+        history_index: Dict[tuple, List[dict]],
+        transferred_count: int
+    ):
+        """
+        预取接下来一批待处理订阅的 Nullbr 资源
+        已排除、会被跳过的订阅不预取；已达单次转存上限时不再预取
+
+        :param subscribes: 接下来要处理的一批订阅
+        :param media_type: 媒体类型
+        :param exclude_ids: 排除的订阅 ID
+        :param history_index: 历史记录索引
+        :param transferred_count: 当前已转存数量
+        """
+        if transferred_count >= self._max_transfer_per_sync:
+            return
+        items = [
+            (media_type, s.tmdbid) for s in subscribes
+            if s.id not in exclude_ids and self._needs_search(s, history_index)
+        ]
+        if items:
+            self._search_handler.prefetch_nullbr(items)
+
+    def _queue_download_history(self, **kwargs):
+        """
+        提交一条下载历史记录，由后台线程写入数据库
+
+        :param kwargs: DownloadHistoryOper.add 的参数
+        """
+        if self._history_writer is None or not self._history_writer.is_alive():
+            self._history_writer = threading.Thread(
+                target=self._download_history_worker,
+                name="p115strgmsub-history",
+                daemon=True
+            )
+            self._history_writer.start()
+        self._history_queue.put(kwargs)
+
+    def _download_history_worker(self):
+        """
+        后台写入下载历史，收到 None 时退出
+        """
+        while True:
+            kwargs = self._history_queue.get()
+            try:
+                if kwargs is None:
+                    return
+                self._downloadhistory_oper.add(**kwargs)
+                logger.debug(f"已记录 {kwargs.get('title')} 下载历史")
+            except Exception as e:
+                logger.warning(f"记录下载历史失败：{e}")
+            finally:
+                self._history_queue.task_done()
+
+    def flush_download_history(self):
+        """
+        等待已提交的下载历史全部写入并结束后台线程，每次同步结束时调用
+        """
+        writer = self._history_writer
+        if writer is None:
+            return
+        self._history_queue.put(None)
+        writer.join()
+        self._history_writer = None
+
+    def reset_sync_cache(self):
+        """
+        清空单次同步内的缓存（分享、名称解析、媒体识别），每次同步开始前调用
+        """
+        self._share_status_cache.clear()
+        self._share_files_cache.clear()
+        self._meta_cache.clear()
+        self._recognize_cache.clear()
+
+    def _get_meta(self, name: str, year: Optional[str], mtype: MediaType, begin_season: Optional[int] = None) -> MetaInfo:
+        """
+        生成订阅元数据，同一名称只解析一次，返回副本以便调用方修改
+
+        :param name: 订阅名称
+        :param year: 年份
+        :param mtype: 媒体类型
+        :param begin_season: 季号，电影不设置
+        :return: 元数据
+        """
+        parsed = self._meta_cache.get(name)
+        if parsed is None:
+            parsed = MetaInfo(name)
+            self._meta_cache[name] = parsed
+        meta = copy.copy(parsed)
+        meta.year = year
+        if begin_season is not None:
+            meta.begin_season = begin_season
+        meta.type = mtype
+        return meta
+
+    def _recognize_media(self, meta: MetaInfo, mtype: MediaType, tmdbid, doubanid) -> Optional[MediaInfo]:
+        """
+        识别媒体信息，同一次同步内相同订阅信息只识别一次
+
+        :param meta: 元数据
+        :param mtype: 媒体类型
+        :param tmdbid: TMDB ID
+        :param doubanid: 豆瓣 ID
+        :return: 媒体信息，识别失败返回 None
+        """
+        # 年份参与缓存键：同名不同年份（如翻拍）且无 tmdbid/doubanid 的订阅不能共用识别结果
+        cache_key = (mtype, tmdbid, doubanid, meta.name, meta.year, meta.begin_season)
+        mediainfo = self._recognize_cache.get(cache_key)
+        if mediainfo is None:
+            mediainfo = self._chain.recognize_media(
+                meta=meta,
+                mtype=mtype,
+                tmdbid=tmdbid,
+                doubanid=doubanid,
+                cache=True
+            )
+            if mediainfo:
+                self._recognize_cache[cache_key] = mediainfo
+        return mediainfo
+
+    def _get_existing_episodes(self, save_dir: str, mediainfo: MediaInfo, season: int) -> Set[int]:
+        """
+        获取网盘目录中已存在的集数，短时间内重复查询同一目录时使用缓存
+
+        :param save_dir: 网盘保存目录
+        :param mediainfo: 媒体信息
+        :param season: 季号
+        :return: 已存在的集数集合
+        """
+        cached = self._existing_cloud_cache.get(save_dir)
+        if cached and time.time() - cached[0] < self._EXISTING_CLOUD_CACHE_TTL:
+            return set(cached[1])
+        existing = FileMatcher.check_existing_episodes(self._p115_manager, mediainfo, season, save_dir)
+        self._existing_cloud_cache[save_dir] = (time.time(), set(existing))
+        return existing
+
+    def _fetch_share(self, share_url: str, target_season: Optional[int] = None) -> Tuple[Any, Optional[List[dict]]]:
+        """
+        检查分享有效性并列出分享文件（优先使用本次同步的缓存）
+
+        :return: (分享状态, 文件列表)，分享无效时文件列表为 None
+        """
+        share_status = self._share_status_cache.get(share_url)
+        if share_status is None:
+            share_status = self._p115_manager.check_share_status(share_url)
+            self._share_status_cache[share_url] = share_status
+        if not share_status.is_valid:
+            return share_status, None
+
+        files_key = (share_url, target_season)
+        share_files = self._share_files_cache.get(files_key)
+        if share_files is None:
+            share_files = self._p115_manager.list_share_files(share_url, target_season=target_season)
+            self._share_files_cache[files_key] = share_files
+        return share_status, share_files
+
+    def _iter_share_prefetch(
+        self,
+        resources: List[dict],
+        target_season: Optional[int] = None
+    ) -> Iterator[Tuple[dict, Optional[Future]]]:
+        """
+        按原顺序遍历搜索结果，同时在后台预取后续分享的有效性和文件列表
+        115 请求仍受客户端速率限制器约束，这里只是让网络等待互相重叠
+
+        :param resources: 搜索结果
+        :param target_season: 目标季数
+        :return: (资源, 预取 Future)；需要解锁或无链接的资源 Future 为 None
+        """
+        if self._share_prefetch_concurrency <= 1:
+            for resource in resources:
+                yield resource, None
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=self._share_prefetch_concurrency,
+            thread_name_prefix="p115strgmsub-share"
+        )
+        pending: Deque[Tuple[dict, Optional[Future]]] = deque()
+        resource_iter = iter(resources)
+
+        def _fill():
+            while len(pending) < self._share_prefetch_concurrency:
+                resource = next(resource_iter, None)
+                if resource is None:
+                    return
+                share_url = resource.get("url", "")
+                future = None
+                if share_url and not resource.get("need_unlock"):
+                    future = executor.submit(self._fetch_share, share_url, target_season)
+                pending.append((resource, future))
+
+        try:
+            _fill()
+            while pending:
+                yield pending.popleft()
+                _fill()
+        finally:
+            # 提前结束遍历时取消尚未开始的预取
+            for _, future in pending:
+                if future:
+                    future.cancel()
+            executor.shutdown(wait=False)
 
     def process_movie_subscribe(
         self,
         subscribe,
         history: List[dict],
         transfer_details: List[Dict[str, Any]],
-        transferred_count: int
+        transferred_count: int,
+        history_index: Optional[Dict[tuple, List[dict]]] = None
     ) -> int:
         """
         处理单个电影订阅
@@ -85,56 +387,53 @@ class SyncHandler:
         :param history: 历史记录列表
         :param transfer_details: 转存详情列表
         :param transferred_count: 当前已转存数量
+        :param history_index: 历史记录索引（见 index_history），未传入时自动构建
         :return: 更新后的转存数量
         """
+        # 订阅属性只读取一次
+        sub_name, sub_year = subscribe.name, subscribe.year
+        tmdbid, doubanid = subscribe.tmdbid, subscribe.doubanid
+        quality, resolution, effect = subscribe.quality, subscribe.resolution, subscribe.effect
+        best_version = subscribe.best_version
+        # 已达单次同步上限时直接跳过，避免无用的媒体识别和网络请求
+        if transferred_count >= self._max_transfer_per_sync:
+            logger.info(f"已达单次同步上限 {self._max_transfer_per_sync}，跳过电影订阅：{sub_name}")
+            return transferred_count
+        if history_index is None:
+            history_index = self.index_history(history)
         try:
-            logger.info(f"处理电影订阅：{subscribe.name} ({subscribe.year})")
+            logger.info(f"处理电影订阅：{sub_name} ({sub_year})")
 
             # 加载该订阅的历史积分花费（用 tmdb_id 作为唯一标识）
-            sub_key = f"tmdb_{subscribe.tmdbid}_movie" if subscribe.tmdbid else f"{subscribe.name}_movie"
+            sub_key = f"tmdb_{tmdbid}_movie" if tmdbid else f"{sub_name}_movie"
             if hasattr(self._search_handler, 'reset_sub_spent_points'):
                 self._search_handler.reset_sub_spent_points(sub_key)
 
-            # 检查历史记录是否已成功转存
-            movie_history_score = -1  # -1 表示未转存过
-            movie_perfect_match = False
-            for h in history:
-                if (h.get("title") == subscribe.name
-                        and h.get("type") == "电影"
-                        and h.get("status") == "成功"):
-                    score = h.get("filter_score", 0)
-                    perfect = h.get("perfect_match", False)
-                    if score > movie_history_score:
-                        movie_history_score = score
-                        movie_perfect_match = perfect
+            # 检查历史记录是否已成功转存（分数 -1 表示未转存过）
+            movie_history_score, movie_perfect_match = self._movie_history_state(sub_name, history_index)
 
             # best_version=1 表示开启洗版（非严格模式）
-            is_best_version = bool(subscribe.best_version)
+            is_best_version = bool(best_version)
 
             if movie_history_score >= 0:
                 if not is_best_version or movie_perfect_match:
-                    logger.info(f"电影 {subscribe.name} 已在历史记录中(洗版:{is_best_version}, 完美匹配:{movie_perfect_match})，跳过")
+                    logger.info(f"电影 {sub_name} 已在历史记录中(洗版:{is_best_version}, 完美匹配:{movie_perfect_match})，跳过")
                     return transferred_count
                 else:
-                    logger.info(f"电影 {subscribe.name} 洗版中，历史分数 {movie_history_score}，尝试寻找更优资源")
+                    logger.info(f"电影 {sub_name} 洗版中，历史分数 {movie_history_score}，尝试寻找更优资源")
 
             # 生成元数据
-            meta = MetaInfo(subscribe.name)
-            meta.year = subscribe.year
-            meta.type = MediaType.MOVIE
+            meta = self._get_meta(sub_name, sub_year, MediaType.MOVIE)
 
             # 识别媒体信息
-            mediainfo: MediaInfo = self._chain.recognize_media(
-                meta=meta,
-                mtype=MediaType.MOVIE,
-                tmdbid=subscribe.tmdbid,
-                doubanid=subscribe.doubanid,
-                cache=True
-            )
+            mediainfo: MediaInfo = self._recognize_media(meta, MediaType.MOVIE, tmdbid, doubanid)
             if not mediainfo:
-                logger.warn(f"无法识别媒体信息：{subscribe.name}")
+                logger.warn(f"无法识别媒体信息：{sub_name}")
                 return transferred_count
 
+            # 海报图片在历史和通知中多次使用，只获取一次
+            poster_image = mediainfo.get_poster_image()
+
             # 搜索网盘资源
             p115_results = self._search_handler.search_resources(
                 mediainfo=mediainfo,
@@ -149,18 +448,19 @@ class SyncHandler:
 
             # 创建订阅过滤条件
             subscribe_filter = SubscribeFilter(
-                quality=subscribe.quality,
-                resolution=subscribe.resolution,
-                effect=subscribe.effect,
+                quality=quality,
+                resolution=resolution,
+                effect=effect,
                 strict=not is_best_version
             )
-            if subscribe_filter.has_filters():
+            has_filters = subscribe_filter.has_filters()
+            if has_filters:
                 mode_text = "洗版模式" if is_best_version else "严格模式"
-                logger.info(f"电影 {subscribe.name} 过滤条件({mode_text}) - 质量: {subscribe.quality}, 分辨率: {subscribe.resolution}, 特效: {subscribe.effect}")
+                logger.info(f"电影 {sub_name} 过滤条件({mode_text}) - 质量: {quality}, 分辨率: {resolution}, 特效: {effect}")
 
             # 遍历搜索结果，尝试找到并转存电影
             movie_transferred = False
-            for resource in p115_results:
+            for resource, prefetch in self._iter_share_prefetch(p115_results):
                 if movie_transferred:
                     break
 
@@ -187,13 +487,12 @@ class SyncHandler:
                 logger.info(f"检查分享：{resource_title} - {share_url}")
 
                 try:
-                    # 先检查分享链接是否有效
-                    share_status = self._p115_manager.check_share_status(share_url)
+                    # 先检查分享链接是否有效，再列出分享内容（优先使用预取结果）
+                    share_status, share_files = prefetch.result() if prefetch else self._fetch_share(share_url)
                     if not share_status.is_valid:
                         logger.warning(f"分享链接无效：{share_url}，原因：{share_status.status_text}")
                         continue
 
-                    share_files = self._p115_manager.list_share_files(share_url)
                     if not share_files:
                         logger.info(f"分享链接无内容：{share_url}")
                         continue
@@ -206,16 +505,15 @@ class SyncHandler:
 
                     if matched_file:
                         file_name = matched_file.get('name', '')
-                        logger.info(f"找到匹配文件：{file_name}")
+                        logger.debug(f"找到匹配文件：{file_name}")
 
                         # 计算当前文件的过滤分数和是否完美匹配
-                        _, current_score = subscribe_filter.match(file_name) if subscribe_filter.has_filters() else (True, 0)
-                        is_perfect = subscribe_filter.is_perfect_match(file_name) if subscribe_filter.has_filters() else True
+                        _, current_score, is_perfect = subscribe_filter.evaluate(file_name)
 
                         # 洗版模式下检查是否需要升级资源
                         if is_best_version and movie_history_score >= 0:
                             if current_score <= movie_history_score:
-                                logger.info(f"电影 {mediainfo.title} 已有分数 {movie_history_score}，当前 {current_score}，跳过")
+                                logger.debug(f"电影 {mediainfo.title} 已有分数 {movie_history_score}，当前 {current_score}，跳过")
                                 continue
                             else:
                                 logger.info(f"电影 {mediainfo.title} 洗版：旧分数 {movie_history_score} -> 新分数 {current_score}")
@@ -231,6 +529,9 @@ class SyncHandler:
                             save_path=save_dir
                         )
 
+                        # 本次转存的历史和下载记录共用同一时间戳
+                        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
                         # 记录历史
                         history_item = {
                             "title": mediainfo.title,
@@ -241,15 +542,15 @@ class SyncHandler:
                             "file_name": file_name,
                             "filter_score": current_score,
                             "perfect_match": is_perfect,
-                            "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            "time": now_str
                         }
-                        history.append(history_item)
+                        self._extend_history(history, history_index, [history_item])
 
                         if success:
                             transferred_count += 1
                             movie_transferred = True
                             movie_history_score = current_score
-                            score_info = f"(分数:{current_score}, 完美匹配:{is_perfect})" if subscribe_filter.has_filters() else ""
+                            score_info = f"(分数:{current_score}, 完美匹配:{is_perfect})" if has_filters else ""
                             logger.info(f"成功转存电影：{mediainfo.title} {score_info}")
 
                             # 收集转存详情用于通知
@@ -257,13 +558,13 @@ class SyncHandler:
                                 "type": "电影",
                                 "title": mediainfo.title,
                                 "year": mediainfo.year,
-                                "image": mediainfo.get_poster_image(),
+                                "image": poster_image,
                                 "file_name": file_name
                             })
 
                             # 添加下载历史记录
                             try:
-                                DownloadHistoryOper().add(
+                                self._queue_download_history(
                                     path=save_dir,
                                     type=mediainfo.type.value,
                                     title=mediainfo.title,
@@ -272,17 +573,17 @@ class SyncHandler:
                                     imdbid=mediainfo.imdb_id,
                                     tvdbid=mediainfo.tvdb_id,
                                     doubanid=mediainfo.douban_id,
-                                    image=mediainfo.get_poster_image(),
+                                    image=poster_image,
                                     downloader="115网盘",
                                     download_hash=matched_file.get("id"),
                                     torrent_name=resource_title,
                                     torrent_description=file_name,
                                     torrent_site="115网盘",
                                     username="P115StrgmSub",
-                                    date=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    note={"source": f"Subscribe|{subscribe.name}", "share_url": share_url}
+                                    date=now_str,
+                                    note={"source": f"Subscribe|{sub_name}", "share_url": share_url}
                                 )
-                                logger.debug(f"已记录电影 {mediainfo.title} 下载历史")
+                                logger.debug(f"已提交电影 {mediainfo.title} 下载历史")
                             except Exception as e:
                                 logger.warning(f"记录下载历史失败：{e}")
 
@@ -303,7 +604,7 @@ class SyncHandler:
                     continue
 
         except Exception as e:
-            logger.error(f"处理电影订阅 {subscribe.name} 出错：{str(e)}")
+            logger.error(f"处理电影订阅 {sub_name} 出错：{str(e)}")
 
         return transferred_count
 
@@ -313,7 +614,8 @@ class SyncHandler:
         history: List[dict],
         transfer_details: List[Dict[str, Any]],
         transferred_count: int,
-        exclude_ids: Set[int]
+        exclude_ids: Set[int],
+        history_index: Optional[Dict[tuple, List[dict]]] = None
     ) -> int:
         """
         处理单个电视剧订阅
@@ -323,45 +625,58 @@ class SyncHandler:
         :param transfer_details: 转存详情列表
         :param transferred_count: 当前已转存数量
         :param exclude_ids: 排除的订阅ID集合
+        :param history_index: 历史记录索引（见 index_history），未传入时自动构建
         :return: 更新后的转存数量
         """
+        # 订阅属性只读取一次
+        sub_name, sub_year = subscribe.name, subscribe.year
+        sub_season = subscribe.season
+        season_no = sub_season or 1
+        start_episode, total_episode, lack_episode = subscribe.start_episode, subscribe.total_episode, subscribe.lack_episode
+        tmdbid, doubanid = subscribe.tmdbid, subscribe.doubanid
+        quality, resolution, effect = subscribe.quality, subscribe.resolution, subscribe.effect
+        best_version = subscribe.best_version
+        # 已达单次同步上限时直接跳过，避免无用的媒体识别和网络请求
+        if transferred_count >= self._max_transfer_per_sync:
+            logger.info(f"已达单次同步上限 {self._max_transfer_per_sync}，跳过订阅：{sub_name} (S{season_no})")
+            return transferred_count
+        if history_index is None:
+            history_index = self.index_history(history)
         try:
-            logger.info(f"订阅信息：{subscribe.name}，开始集数：{subscribe.start_episode}, 总集数：{subscribe.total_episode}, 缺失集数：{subscribe.lack_episode}")
-            logger.info(f"处理订阅：{subscribe.name} (S{subscribe.season or 1})")
+            logger.info(f"订阅信息：{sub_name}，开始集数：{start_episode}, 总集数：{total_episode}, 缺失集数：{lack_episode}")
+            logger.info(f"处理订阅：{sub_name} (S{season_no})")
 
             # 加载该订阅的历史积分花费（用 tmdb_id + 季数作为唯一标识）
-            sub_key = f"tmdb_{subscribe.tmdbid}_S{subscribe.season or 1}" if subscribe.tmdbid else f"{subscribe.name}_S{subscribe.season or 1}"
+            sub_key = f"tmdb_{tmdbid}_S{season_no}" if tmdbid else f"{sub_name}_S{season_no}"
             if hasattr(self._search_handler, 'reset_sub_spent_points'):
                 self._search_handler.reset_sub_spent_points(sub_key)
 
             # 早期检查：如果订阅显示没有缺失集数，跳过处理
-            if subscribe.lack_episode == 0:
-                logger.info(f"{subscribe.name} S{subscribe.season or 1} 订阅显示媒体库已完整(lack_episode=0)，跳过")
+            if lack_episode == 0:
+                logger.info(f"{sub_name} S{season_no} 订阅显示媒体库已完整(lack_episode=0)，跳过")
                 return transferred_count
 
             # 生成元数据
-            meta = MetaInfo(subscribe.name)
-            meta.year = subscribe.year
-            meta.begin_season = subscribe.season or 1
-            meta.type = MediaType.TV
+            meta = self._get_meta(sub_name, sub_year, MediaType.TV, begin_season=season_no)
 
             # 识别媒体信息
-            mediainfo: MediaInfo = self._chain.recognize_media(
-                meta=meta,
-                mtype=MediaType.TV,
-                tmdbid=subscribe.tmdbid,
-                doubanid=subscribe.doubanid,
-                cache=True
-            )
+            mediainfo: MediaInfo = self._recognize_media(meta, MediaType.TV, tmdbid, doubanid)
 
             if not mediainfo:
-                logger.warn(f"无法识别媒体信息：{subscribe.name}")
+                logger.warn(f"无法识别媒体信息：{sub_name}")
                 return transferred_count
 
+            # 海报图片在历史和通知中多次使用，只获取一次
+            poster_image = mediainfo.get_poster_image()
+
+            # 构建转存路径（标题 + 年份，格式如 "权力的游戏 (2011)"）
+            show_folder = f"{mediainfo.title} ({mediainfo.year})" if mediainfo.year else mediainfo.title
+            save_dir = f"{self._save_path}/{show_folder}/Season {season_no}"
+
             # 构造总集数信息
             totals = {}
-            if subscribe.season and subscribe.total_episode:
-                totals = {subscribe.season: subscribe.total_episode}
+            if sub_season and total_episode:
+                totals = {sub_season: total_episode}
 
             # 获取缺失剧集
             downloadchain = DownloadChain()
@@ -374,8 +689,8 @@ class SyncHandler:
             if exist_flag:
                 logger.info(f"{mediainfo.title_year} S{meta.begin_season} 媒体库中已完整存在")
                 # 媒体库已完整，调用完成订阅逻辑
-                total_ep = subscribe.total_episode or 0
-                start_ep = subscribe.start_episode or 1
+                total_ep = total_episode or 0
+                start_ep = start_episode or 1
                 if total_ep > 0:
                     all_episodes = list(range(start_ep, total_ep + 1))
                     self._subscribe_handler.check_and_finish_subscribe(
@@ -383,13 +698,30 @@ class SyncHandler:
                         mediainfo=mediainfo,
                         success_episodes=all_episodes
                     )
-                elif subscribe.lack_episode != 0:
-                    SubscribeOper().update(subscribe.id, {"lack_episode": 0})
+                elif lack_episode != 0:
+                    self._subscribe_oper.update(subscribe.id, {"lack_episode": 0})
                 # 订阅已完整，清除历史积分记录
                 if hasattr(self._search_handler, 'clear_sub_points'):
                     self._search_handler.clear_sub_points(sub_key)
                 return transferred_count
 
+            # 快速路径：网盘中已包含订阅范围内的全部集数时，直接完成订阅，无需再计算缺失集数
+            # 洗版订阅需要继续检查待升级的集数，不走快速路径；网盘列表结果会被后续检查复用（缓存）
+            if not best_version and total_episode and total_episode > 0:
+                expected_episodes = set(range(start_episode or 1, total_episode + 1))
+                existing_episodes_in_cloud = self._get_existing_episodes(save_dir, mediainfo, season_no)
+                if expected_episodes and expected_episodes <= existing_episodes_in_cloud:
+                    logger.info(f"{mediainfo.title_year} S{season_no} 网盘已包含全部 {len(expected_episodes)} 集")
+                    self._subscribe_handler.check_and_finish_subscribe(
+                        subscribe=subscribe,
+                        mediainfo=mediainfo,
+                        success_episodes=list(existing_episodes_in_cloud)
+                    )
+                    # 订阅已完整，清除历史积分记录
+                    if hasattr(self._search_handler, 'clear_sub_points'):
+                        self._search_handler.clear_sub_points(sub_key)
+                    return transferred_count
+
             # 获取缺失的集数列表
             season = meta.begin_season or 1
             missing_episodes = []
@@ -409,43 +741,34 @@ class SyncHandler:
                 return transferred_count
 
             # 过滤掉小于开始集数的剧集
-            if subscribe.start_episode:
+            if start_episode:
                 original_count = len(missing_episodes)
-                missing_episodes = [ep for ep in missing_episodes if ep >= subscribe.start_episode]
+                missing_episodes = [ep for ep in missing_episodes if ep >= start_episode]
                 if len(missing_episodes) < original_count:
-                    logger.info(f"根据订阅设置，过滤掉小于 {subscribe.start_episode} 的剧集")
+                    logger.info(f"根据订阅设置，过滤掉小于 {start_episode} 的剧集")
 
             # best_version=1 表示开启洗版
-            is_best_version = bool(subscribe.best_version)
+            is_best_version = bool(best_version)
 
             # 从历史记录中排除已成功转存的集数
             transferred_episodes = set()
             episode_history_scores: Dict[int, int] = {}
-            for h in history:
-                if (h.get("title") == mediainfo.title
-                        and h.get("season") == season
-                        and h.get("status") == "成功"):
-                    ep = h.get("episode")
-                    score = h.get("filter_score", 0)
-                    perfect = h.get("perfect_match", False)
-
-                    if not is_best_version:
+            for h in history_index.get(("电视剧", mediainfo.title, season), ()):
+                ep = h.get("episode")
+                score = h.get("filter_score", 0)
+                perfect = h.get("perfect_match", False)
+
+                if not is_best_version:
+                    transferred_episodes.add(ep)
+                else:
+                    if perfect:
                         transferred_episodes.add(ep)
                     else:
-                        if perfect:
-                            transferred_episodes.add(ep)
-                        else:
-                            if ep not in episode_history_scores or score > episode_history_scores[ep]:
-                                episode_history_scores[ep] = score
-
-            # 构建转存路径（标题 + 年份，格式如 "权力的游戏 (2011)"）
-            show_folder = f"{mediainfo.title} ({mediainfo.year})" if mediainfo.year else mediainfo.title
-            save_dir = f"{self._save_path}/{show_folder}/Season {season}"
+                        if ep not in episode_history_scores or score > episode_history_scores[ep]:
+                            episode_history_scores[ep] = score
 
-            # 检查网盘目录中已存在的剧集
-            existing_episodes_in_cloud = FileMatcher.check_existing_episodes(
-                self._p115_manager, mediainfo, season, save_dir
-            )
+            # 检查网盘目录中已存在的剧集（快速路径中已查询过时直接命中缓存）
+            existing_episodes_in_cloud = self._get_existing_episodes(save_dir, mediainfo, season)
 
             # 合并已存在的集数
             all_existing = transferred_episodes | existing_episodes_in_cloud
@@ -512,17 +835,26 @@ class SyncHandler:
 
             # 创建订阅过滤条件
             subscribe_filter = SubscribeFilter(
-                quality=subscribe.quality,
-                resolution=subscribe.resolution,
-                effect=subscribe.effect,
+                quality=quality,
+                resolution=resolution,
+                effect=effect,
                 strict=not is_best_version
             )
-            if subscribe_filter.has_filters():
+            has_filters = subscribe_filter.has_filters()
+            if has_filters:
                 mode_text = "洗版模式" if is_best_version else "严格模式"
-                logger.info(f"{mediainfo.title} S{season} 过滤条件({mode_text}) - 质量: {subscribe.quality}, 分辨率: {subscribe.resolution}, 特效: {subscribe.effect}")
-
-            # 成功转存的集数列表
-            success_episodes = []
+                logger.info(f"{mediainfo.title} S{season} 过滤条件({mode_text}) - 质量: {quality}, 分辨率: {resolution}, 特效: {effect}")
+
+            # 成功转存的集数（洗版升级的集数不计入）
+            success_episodes: Set[int] = set()
+            # 本季的转存详情，同一季的集数合并到一条详情中，只在进入时查找一次
+            detail_key = (mediainfo.title, season)
+            current_detail: Optional[Dict[str, Any]] = next(
+                (d for d in transfer_details if (d.get("title"), d.get("season")) == detail_key),
+                None
+            )
+            # 剩余缺失集数：列表保持顺序，集合用于 O(1) 判断和移除
+            missing_set = set(missing_episodes)
 
             # 智能回退搜索：按源迭代
             enabled_sources = self._search_handler.get_enabled_sources()
@@ -531,16 +863,19 @@ class SyncHandler:
                 logger.warning(f"没有可用的搜索源，跳过 {mediainfo.title} S{season} 的搜索")
                 return transferred_count
 
+            source_count = len(enabled_sources)
             for source_index, source in enumerate(enabled_sources):
-                if not missing_episodes:
+                # 下一个搜索源（仅用于日志）
+                next_source = enabled_sources[source_index + 1] if source_index + 1 < source_count else None
+                if not missing_set:
                     logger.info(f"{mediainfo.title_year} S{season} 所有缺失剧集已转存完成，不再查询后续源")
                     break
 
                 if transferred_count >= self._max_transfer_per_sync:
-                    logger.info(f"已达单次同步上限 {self._max_transfer_per_sync}，剩余 {len(missing_episodes)} 集将在下次同步处理")
+                    logger.info(f"已达单次同步上限 {self._max_transfer_per_sync}，剩余 {len(missing_set)} 集将在下次同步处理")
                     break
 
-                logger.info(f"[{source.upper()}] 开始搜索 {mediainfo.title} S{season}（当前缺失: {len(missing_episodes)} 集）")
+                logger.info(f"[{source.upper()}] 开始搜索 {mediainfo.title} S{season}（当前缺失: {len(missing_set)} 集）")
 
                 # 搜索当前源
                 p115_results = self._search_handler.search_single_source(
@@ -551,9 +886,8 @@ class SyncHandler:
                 )
 
                 if not p115_results:
-                    remaining_sources = enabled_sources[source_index + 1:]
-                    if remaining_sources:
-                        logger.info(f"[{source.upper()}] 未找到资源，将尝试下一个源: {remaining_sources[0].upper()}")
+                    if next_source:
+                        logger.info(f"[{source.upper()}] 未找到资源，将尝试下一个源: {next_source.upper()}")
                     else:
                         logger.info(f"[{source.upper()}] 未找到资源，已无更多可用源")
                     continue
@@ -561,9 +895,14 @@ class SyncHandler:
                 logger.info(f"[{source.upper()}] 找到 {len(p115_results)} 个 115 网盘资源")
 
                 # 遍历搜索结果
-                for resource in p115_results:
+                target_season = season if self._skip_other_season_dirs else None
+                for resource, prefetch in self._iter_share_prefetch(p115_results, target_season):
+                    # 前面的分享已补齐所有缺失集数（包括上一个分享出错的情况），不再处理后续分享
+                    if not missing_set:
+                        break
+
                     if transferred_count >= self._max_transfer_per_sync:
-                        logger.info(f"已达单次同步上限 {self._max_transfer_per_sync}，剩余 {len(missing_episodes)} 集将在下次同步处理")
+                        logger.info(f"已达单次同步上限 {self._max_transfer_per_sync}，剩余 {len(missing_set)} 集将在下次同步处理")
                         break
 
                     share_url = resource.get("url", "")
@@ -589,17 +928,14 @@ class SyncHandler:
                     logger.info(f"检查分享：{resource_title} - {share_url}")
 
                     try:
-                        # 检查分享链接是否有效
-                        share_status = self._p115_manager.check_share_status(share_url)
+                        # 检查分享链接是否有效并列出分享内容（优先使用预取结果）
+                        share_status, share_files = (
+                            prefetch.result() if prefetch else self._fetch_share(share_url, target_season)
+                        )
                         if not share_status.is_valid:
                             logger.warning(f"分享链接无效：{share_url}，原因：{share_status.status_text}")
                             continue
 
-                        # 列出分享内容
-                        share_files = self._p115_manager.list_share_files(
-                            share_url,
-                            target_season=(season if self._skip_other_season_dirs else None)
-                        )
                         if not share_files:
                             logger.info(f"分享链接无内容：{share_url}")
                             continue
@@ -609,27 +945,28 @@ class SyncHandler:
                         # 收集该分享中所有匹配的文件
                         matched_items = []
 
-                        for episode in missing_episodes[:]:
-                            matched_file = FileMatcher.match_episode_file(
-                                share_files,
-                                mediainfo.title,
-                                season,
-                                episode,
-                                subscribe_filter=subscribe_filter
-                            )
+                        # 一次遍历分享文件，同时匹配所有仍缺失的集数
+                        episode_matches = FileMatcher.match_episodes_bulk(
+                            share_files,
+                            mediainfo.title,
+                            season,
+                            [ep for ep in missing_episodes if ep in missing_set],
+                            subscribe_filter=subscribe_filter
+                        )
 
+                        for episode in missing_episodes:
+                            matched_file = episode_matches.get(episode)
                             if matched_file:
                                 file_name = matched_file.get('name', '')
-                                logger.info(f"找到匹配文件：{file_name} -> E{episode:02d}")
+                                logger.debug(f"找到匹配文件：{file_name} -> E{episode:02d}")
 
-                                _, current_score = subscribe_filter.match(file_name) if subscribe_filter.has_filters() else (True, 0)
-                                is_perfect = subscribe_filter.is_perfect_match(file_name) if subscribe_filter.has_filters() else True
+                                _, current_score, is_perfect = subscribe_filter.evaluate(file_name)
 
                                 is_upgrade = False
                                 if is_best_version and episode in episode_history_scores:
                                     old_score = episode_history_scores[episode]
                                     if current_score <= old_score:
-                                        logger.info(f"E{episode:02d} 已有分数 {old_score}，当前 {current_score}，跳过")
+                                        logger.debug(f"E{episode:02d} 已有分数 {old_score}，当前 {current_score}，跳过")
                                         continue
                                     else:
                                         logger.info(f"E{episode:02d} 洗版：旧分数 {old_score} -> 新分数 {current_score}")
@@ -653,8 +990,8 @@ class SyncHandler:
                             logger.info(f"匹配 {len(matched_items)} 集，但受配额限制仅转存 {remaining_quota} 集")
                             matched_items = matched_items[:remaining_quota]
 
-                        # 批量转存
-                        file_ids = [item["file"]["id"] for item in matched_items]
+                        # 批量转存（多集合一文件可能被多个集数匹配，按原顺序去重）
+                        file_ids = list(dict.fromkeys(item["file"]["id"] for item in matched_items))
                         logger.info(f"准备批量转存 {len(file_ids)} 个文件到: {save_dir}")
 
                         success_ids, failed_ids = self._p115_manager.transfer_files_batch(
@@ -664,8 +1001,13 @@ class SyncHandler:
                             batch_size=self._batch_size
                         )
 
-                        success_id_set = set(success_ids)
+                        # 统一按字符串比较，避免接口返回的 id 类型与分享列表不一致
+                        success_id_set = {str(x) for x in success_ids}
                         batch_success_episodes = []
+                        # 本批次的历史记录，处理完结果后一次性写入
+                        pending_history: List[dict] = []
+                        # 同一批次的历史和下载记录共用同一时间戳
+                        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
                         # 处理结果
                         for item in matched_items:
@@ -675,7 +1017,7 @@ class SyncHandler:
                             current_score = item["score"]
                             is_perfect = item["is_perfect"]
                             is_upgrade = item["is_upgrade"]
-                            success = file_id in success_id_set
+                            success = str(file_id) in success_id_set
 
                             history_item = {
                                 "title": mediainfo.title,
@@ -687,51 +1029,49 @@ class SyncHandler:
                                 "file_name": file_name,
                                 "filter_score": current_score,
                                 "perfect_match": is_perfect,
-                                "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                                "time": now_str
                             }
-                            history.append(history_item)
+                            pending_history.append(history_item)
 
                             if success:
                                 transferred_count += 1
                                 episode_history_scores[episode] = current_score
 
-                                if episode in missing_episodes:
-                                    missing_episodes.remove(episode)
+                                missing_set.discard(episode)
 
                                 if not is_upgrade:
-                                    success_episodes.append(episode)
+                                    success_episodes.add(episode)
 
-                                score_info = f"(分数:{current_score}, 完美匹配:{is_perfect})" if subscribe_filter.has_filters() else ""
+                                score_info = f"(分数:{current_score}, 完美匹配:{is_perfect})" if has_filters else ""
                                 upgrade_info = " [洗版升级]" if is_upgrade else ""
                                 logger.info(f"成功转存：{mediainfo.title} S{season:02d}E{episode:02d} {score_info}{upgrade_info}")
 
-                                # 收集转存详情
-                                existing_detail = next(
-                                    (d for d in transfer_details
-                                     if d.get("title") == mediainfo.title and d.get("season") == season),
-                                    None
-                                )
-                                if existing_detail:
-                                    existing_detail["episodes"].append(episode)
-                                else:
-                                    transfer_details.append({
+                                # 收集转存详情（首次成功时创建，之后直接追加）
+                                if current_detail is None:
+                                    current_detail = {
                                         "type": "电视剧",
                                         "title": mediainfo.title,
                                         "year": mediainfo.year,
                                         "season": season,
-                                        "episodes": [episode],
-                                        "image": mediainfo.get_poster_image()
-                                    })
+                                        "episodes": [],
+                                        "image": poster_image
+                                    }
+                                    transfer_details.append(current_detail)
+                                current_detail["episodes"].append(episode)
 
                                 batch_success_episodes.append(episode)
                             else:
                                 logger.error(f"转存失败：{mediainfo.title} S{season:02d}E{episode:02d}")
 
+                        self._extend_history(history, history_index, pending_history)
+
                         # 记录下载历史
                         if batch_success_episodes:
+                            # 目录内容已变化，使已存在集数缓存失效
+                            self._existing_cloud_cache.pop(save_dir, None)
                             try:
                                 episodes_str = StringUtils.format_ep(batch_success_episodes)
-                                DownloadHistoryOper().add(
+                                self._queue_download_history(
                                     path=save_dir,
                                     type=mediainfo.type.value,
                                     title=mediainfo.title,
@@ -742,20 +1082,20 @@ class SyncHandler:
                                     doubanid=mediainfo.douban_id,
                                     seasons=f"S{season:02d}",
                                     episodes=episodes_str,
-                                    image=mediainfo.get_poster_image(),
+                                    image=poster_image,
                                     downloader="115网盘",
                                     download_hash=share_url,
                                     torrent_name=resource_title,
                                     torrent_site="115网盘",
                                     username="P115StrgmSub",
-                                    date=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    note={"source": f"Subscribe|{subscribe.name}", "share_url": share_url}
+                                    date=now_str,
+                                    note={"source": f"Subscribe|{sub_name}", "share_url": share_url}
                                 )
-                                logger.debug(f"已记录 {mediainfo.title} S{season:02d} {episodes_str} 下载历史")
+                                logger.debug(f"已提交 {mediainfo.title} S{season:02d} {episodes_str} 下载历史")
                             except Exception as e:
                                 logger.warning(f"记录下载历史失败：{e}")
 
-                        if not missing_episodes:
+                        if not missing_set:
                             break
 
                     except Exception as e:
@@ -763,16 +1103,15 @@ class SyncHandler:
                         continue
 
                 # 当前源处理完成
-                if missing_episodes:
-                    remaining_sources = enabled_sources[source_index + 1:]
-                    if remaining_sources:
-                        logger.info(f"[{source.upper()}] 处理完成，仍有 {len(missing_episodes)} 集缺失，继续查询下一个源: {remaining_sources[0].upper()}")
+                if missing_set:
+                    if next_source:
+                        logger.info(f"[{source.upper()}] 处理完成，仍有 {len(missing_set)} 集缺失，继续查询下一个源: {next_source.upper()}")
                     else:
-                        logger.info(f"[{source.upper()}] 处理完成，仍有 {len(missing_episodes)} 集缺失，已无更多可用源")
+                        logger.info(f"[{source.upper()}] 处理完成，仍有 {len(missing_set)} 集缺失，已无更多可用源")
 
             # 更新订阅状态
             # 将网盘已存在的集数和本次成功转存的集数合并
-            all_success_episodes = list(set(success_episodes) | existing_episodes_in_cloud)
+            all_success_episodes = list(existing_episodes_in_cloud.union(success_episodes))
             if all_success_episodes:
                 self._subscribe_handler.check_and_finish_subscribe(
                     subscribe=subscribe,
@@ -780,17 +1119,17 @@ class SyncHandler:
                     success_episodes=all_success_episodes
                 )
                 # 如果订阅已完成（缺失集数归零），清除该订阅的历史积分记录
-                total_ep = subscribe.total_episode or 0
-                start_ep = subscribe.start_episode or 1
+                total_ep = total_episode or 0
+                start_ep = start_episode or 1
                 if total_ep > 0:
                     expected = set(range(start_ep, total_ep + 1))
-                    downloaded = set(subscribe.note or []).union(set(all_success_episodes))
+                    downloaded = set(subscribe.note or []).union(all_success_episodes)
                     if not (expected - downloaded):
                         if hasattr(self._search_handler, 'clear_sub_points'):
                             self._search_handler.clear_sub_points(sub_key)
 
         except Exception as e:
-            logger.error(f"处理订阅 {subscribe.name} 出错：{str(e)}")
+            logger.error(f"处理订阅 {sub_name} 出错：{str(e)}")
 
         return transferred_count
 
@@ -801,38 +1140,41 @@ class SyncHandler:
         :param transfer_details: 转存详情列表
         :param total_count: 转存总数
         """
-        if not transfer_details or not self._post_message:
+        post = self._post_message
+        if not transfer_details or not post:
             return
 
+        # 通知最多展示的条目数，超出部分只显示总数，不再格式化
+        max_lines = 10
         text_lines = []
-        first_image = None
 
-        for detail in transfer_details:
+        for detail in islice(transfer_details, max_lines):
+            title = detail.get("title", "未知")
             if detail.get("type") == "电影":
-                title = detail.get("title", "未知")
-                year = detail.get("year", "")
-                text_lines.append(f"{title} ({year})")
-                if not first_image and detail.get("image"):
-                    first_image = detail.get("image")
+                text_lines.append(f"{title} ({detail.get('year', '')})")
             else:
-                title = detail.get("title", "未知")
                 season = detail.get("season", 1)
                 episodes = detail.get("episodes", [])
-                episodes.sort()
-                if len(episodes) <= 5:
-                    ep_str = ", ".join([f"E{e:02d}" for e in episodes])
+                if not episodes:
+                    continue
+                count = len(episodes)
+                if count <= 5:
+                    # 排序副本，不修改调用方的集数列表
+                    ep_str = ", ".join(f"E{e:02d}" for e in sorted(episodes))
                 else:
-                    ep_str = f"E{episodes[0]:02d}-E{episodes[-1]:02d} 共{len(episodes)}集"
+                    # 集数较多时只需首尾，无需排序；不连续时附上总集数
+                    first_ep, last_ep = min(episodes), max(episodes)
+                    if last_ep - first_ep + 1 == count:
+                        ep_str = f"E{first_ep:02d}-E{last_ep:02d}"
+                    else:
+                        ep_str = f"E{first_ep:02d}-E{last_ep:02d} 共{count}集"
                 text_lines.append(f"{title} S{season:02d} {ep_str}")
-                if not first_image and detail.get("image"):
-                    first_image = detail.get("image")
 
-        if len(text_lines) > 10:
-            text_lines = text_lines[:10]
+        if len(transfer_details) > max_lines:
             text_lines.append(f"... 等共 {len(transfer_details)} 项")
 
-        self._post_message(
-            mtype=NotificationType.Plugin,
+        post(
+            mtype=_PLUGIN_NTYPE,
             title=f"【115网盘订阅追更】转存完成",
             text=f"本次共转存 {total_count} 个文件\n\n" + "\n".join(text_lines)
         )
@@ -4,7 +4,7 @@
 """
 import re
 from pathlib import Path
-from typing import List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from app.core.metainfo import MetaInfo
 from app.schemas import MediaInfo
 from app.log import logger
@@ -26,82 +26,88 @@ class SubscribeFilter:
         self.resolution = resolution
         self.effect = effect
         self.strict = strict
+        # 已设置的规则：(名称, 正则, 预编译正则)，每个订阅只编译一次
+        self._rules: Tuple[Tuple[str, str, Optional[re.Pattern]], ...] = tuple(
+            (label, pattern, self._compile(label, pattern))
+            for label, pattern in (("质量", quality), ("分辨率", resolution), ("特效", effect))
+            if pattern
+        )
+        # 文件名 -> (是否匹配, 匹配分数, 是否完美匹配)
+        self._evaluate_cache: Dict[str, Tuple[bool, int, bool]] = {}
+
+    @staticmethod
+    def _compile(label: str, pattern: str) -> Optional[re.Pattern]:
+        """
+        预编译过滤规则，规则无效时记录警告并视为不匹配
+
+        :param label: 规则名称
+        :param pattern: 正则表达式
+        :return: 编译后的正则，无效时返回 None
+        """
+        try:
+            return re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            logger.warning(f"订阅过滤{label}规则无效: {pattern}，{e}")
+            return None
 
     def has_filters(self) -> bool:
         """是否有任何过滤条件"""
-        return bool(self.quality or self.resolution or self.effect)
+        return bool(self._rules)
 
-    def match(self, file_name: str) -> Tuple[bool, int]:
+    def evaluate(self, file_name: str) -> Tuple[bool, int, bool]:
         """
-        检查文件名是否符合过滤条件
+        一次性计算文件名的匹配结果，同一文件名只计算一次
 
         :param file_name: 文件名
-        :return: (是否匹配, 匹配分数) - 分数越高越优先
-                 严格模式下不匹配返回 (False, 0)
-                 非严格模式下不匹配返回 (True, 较低分数)
+        :return: (是否匹配, 匹配分数, 是否完美匹配)
         """
-        if not self.has_filters():
-            return True, 0
+        if not self._rules:
+            return True, 0, True
+
+        cached = self._evaluate_cache.get(file_name)
+        if cached is not None:
+            return cached
 
         score = 0
-        matched_count = 0
-        total_rules = 0
-
-        # 检查质量
-        if self.quality:
-            total_rules += 1
-            if re.search(self.quality, file_name, re.IGNORECASE):
-                score += 100  # 质量匹配加 100 分
-                matched_count += 1
-                logger.info(f"文件 {file_name} 匹配质量规则: {self.quality}")
-            else:
-                logger.info(f"文件 {file_name} 不匹配质量规则: {self.quality}")
-                if self.strict:
-                    return False, 0
-
-        # 检查分辨率
-        if self.resolution:
-            total_rules += 1
-            if re.search(self.resolution, file_name, re.IGNORECASE):
-                score += 100  # 分辨率匹配加 100 分
-                matched_count += 1
-                logger.info(f"文件 {file_name} 匹配分辨率规则: {self.resolution}")
+        perfect = True
+        for label, pattern, regex in self._rules:
+            if regex is not None and regex.search(file_name):
+                score += 100  # 每条规则匹配加 100 分
+                logger.debug(f"文件 {file_name} 匹配{label}规则: {pattern}")
             else:
-                logger.info(f"文件 {file_name} 不匹配分辨率规则: {self.resolution}")
+                logger.debug(f"文件 {file_name} 不匹配{label}规则: {pattern}")
+                perfect = False
                 if self.strict:
-                    return False, 0
-
-        # 检查特效
-        if self.effect:
-            total_rules += 1
-            if re.search(self.effect, file_name, re.IGNORECASE):
-                score += 100  # 特效匹配加 100 分
-                matched_count += 1
-                logger.info(f"文件 {file_name} 匹配特效规则: {self.effect}")
-            else:
-                logger.info(f"文件 {file_name} 不匹配特效规则: {self.effect}")
-                if self.strict:
-                    return False, 0
+                    break
+
+        if perfect or not self.strict:
+            # 非严格模式下，即使不完全匹配也返回 True，但分数较低
+            # 完全匹配的资源分数更高，便于后续替换
+            result = (True, score, perfect)
+        else:
+            result = (False, 0, False)
 
-        # 非严格模式下，即使不完全匹配也返回 True，但分数较低
-        # 完全匹配的资源分数更高，便于后续替换
-        return True, score
+        self._evaluate_cache[file_name] = result
+        return result
+
+    def match(self, file_name: str) -> Tuple[bool, int]:
+        """
+        检查文件名是否符合过滤条件
+
+        :param file_name: 文件名
+        :return: (是否匹配, 匹配分数) - 分数越高越优先
+                 严格模式下不匹配返回 (False, 0)
+                 非严格模式下不匹配返回 (True, 较低分数)
+        """
+        matched, score, _ = self.evaluate(file_name)
+        return matched, score
 
     def is_perfect_match(self, file_name: str) -> bool:
         """
         检查文件是否完全匹配所有过滤条件
         用于判断是否需要替换已有资源
         """
-        if not self.has_filters():
-            return True
-
-        if self.quality and not re.search(self.quality, file_name, re.IGNORECASE):
-            return False
-        if self.resolution and not re.search(self.resolution, file_name, re.IGNORECASE):
-            return False
-        if self.effect and not re.search(self.effect, file_name, re.IGNORECASE):
-            return False
-        return True
+        return self.evaluate(file_name)[2]
 
 
 class FileMatcher:
@@ -109,66 +115,78 @@ class FileMatcher:
 
     # 视频文件扩展名
     VIDEO_EXTENSIONS = {'.mkv', '.mp4', '.avi', '.rmvb', '.wmv', '.flv', '.ts', '.m2ts'}
-    
+
+    # 宽松模式：不包含季号的集数标识（需要额外验证）
+    # 第1集、第175集 格式
+    _CN_EPISODE_RE = re.compile(r'第\s*(\d+)\s*集')
+    # EP01、EP175 格式
+    _EP_EPISODE_RE = re.compile(r'[Ee][Pp](\d+)')
+    # E01格式（开头或特定位置）
+    _E_EPISODE_RE = re.compile(r'[\[\(\s\.\-_][Ee](\d+)(?=[\]\)\s\.\-_])')
+    # 最宽松模式：纯数字匹配 .01. 格式（风险较高，仅作为最后手段）
+    _NUM_EPISODE_RE = re.compile(r'[\.\s\-_](\d+)(?=[\.\s\-_])')
+    # 任意季号标识
+    _SEASON_MARK_RE = re.compile(r'[Ss]\d+[Ee]|第\s*\d+\s*季|[Ss]eason\s*\d+', re.IGNORECASE)
+    # 季号标识：S01E、第1季、Season 1
+    _SXE_SEASON_RE = re.compile(r'[Ss](\d{1,2})[Ee]')
+    _CN_SEASON_RE = re.compile(r'第\s*(\d{1,2})\s*季')
+    _EN_SEASON_RE = re.compile(r'[Ss]eason\s*(\d{1,2})', re.IGNORECASE)
+    # S01E01、S1E1、S01E175 等格式
+    _SXEX_RE = re.compile(r'[Ss](\d{1,2})[Ee](\d{1,4})')
+
+    @staticmethod
+    def _parse_season_marks(file_name: str) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+        """
+        一次性提取文件名中的季号标识
+
+        :param file_name: 文件名
+        :return: (SxxE 格式季号, "第X季" 格式季号, "Season X" 格式季号)，未找到为 None
+        """
+        marks = []
+        for pattern in (FileMatcher._SXE_SEASON_RE, FileMatcher._CN_SEASON_RE, FileMatcher._EN_SEASON_RE):
+            match = pattern.search(file_name)
+            marks.append(int(match.group(1)) if match else None)
+        return marks[0], marks[1], marks[2]
+
     @staticmethod
-    def _contains_other_season(file_name: str, target_season: int) -> bool:
+    def _contains_other_season(
+        file_name: str,
+        target_season: int,
+        marks: Optional[Tuple[Optional[int], Optional[int], Optional[int]]] = None
+    ) -> bool:
         """
         检查文件名是否明确包含其他季的标识
 
         :param file_name: 文件名
         :param target_season: 目标季号
+        :param marks: 已解析的季号标识（见 _parse_season_marks），未传入时自动解析
         :return: 是否包含其他季标识
         """
-        # 匹配 S01、S02 等格式，检查是否为其他季
-        season_match = re.search(r'[Ss](\d{1,2})[Ee]', file_name)
-        if season_match:
-            found_season = int(season_match.group(1))
-            if found_season != target_season:
-                return True
-
-        # 匹配 "第X季" 格式
-        cn_season_match = re.search(r'第\s*(\d{1,2})\s*季', file_name)
-        if cn_season_match:
-            found_season = int(cn_season_match.group(1))
-            if found_season != target_season:
-                return True
-
-        # 匹配 Season X 格式
-        en_season_match = re.search(r'[Ss]eason\s*(\d{1,2})', file_name, re.IGNORECASE)
-        if en_season_match:
-            found_season = int(en_season_match.group(1))
-            if found_season != target_season:
-                return True
-
-        return False
+        if marks is None:
+            marks = FileMatcher._parse_season_marks(file_name)
+        # 依次检查 S01E、"第X季"、Season X 格式，任一为其他季即返回
+        return any(found is not None and found != target_season for found in marks)
 
     @staticmethod
-    def _matches_target_season(file_name: str, target_season: int) -> bool:
+    def _matches_target_season(
+        file_name: str,
+        target_season: int,
+        marks: Optional[Tuple[Optional[int], Optional[int], Optional[int]]] = None
+    ) -> bool:
         """
         检查文件名是否明确匹配目标季
 
         :param file_name: 文件名
         :param target_season: 目标季号
+        :param marks: 已解析的季号标识（见 _parse_season_marks），未传入时自动解析
         :return: 是否匹配目标季
         """
-        # 匹配 S01、S02 等格式
-        season_match = re.search(r'[Ss](\d{1,2})[Ee]', file_name)
-        if season_match:
-            found_season = int(season_match.group(1))
-            return found_season == target_season
-
-        # 匹配 "第X季" 格式
-        cn_season_match = re.search(r'第\s*(\d{1,2})\s*季', file_name)
-        if cn_season_match:
-            found_season = int(cn_season_match.group(1))
-            return found_season == target_season
-
-        # 匹配 Season X 格式
-        en_season_match = re.search(r'[Ss]eason\s*(\d{1,2})', file_name, re.IGNORECASE)
-        if en_season_match:
-            found_season = int(en_season_match.group(1))
-            return found_season == target_season
-
+        if marks is None:
+            marks = FileMatcher._parse_season_marks(file_name)
+        # 按 S01E、"第X季"、Season X 的优先级取第一个找到的季号
+        for found in marks:
+            if found is not None:
+                return found == target_season
         return False
 
     @staticmethod
@@ -180,61 +198,91 @@ class FileMatcher:
         :return: (季号, 集号) 或 None
         """
         # 匹配 S01E01、S1E1、S01E175 等格式（支持1-4位集数）
-        match = re.search(r'[Ss](\d{1,2})[Ee](\d{1,4})', file_name)
+        match = FileMatcher._SXEX_RE.search(file_name)
         if match:
             return int(match.group(1)), int(match.group(2))
         return None
 
     @staticmethod
-    def match_episode_file(
+    def _parse_loose_episodes(file_name: str) -> Tuple[Set[int], Set[int]]:
+        """
+        一次性提取文件名中宽松模式与最宽松模式可能对应的全部集号
+
+        与按集号拼接正则逐个匹配等价：
+        - 第X集 / EPX：数字必须与集号完全一致
+        - EX / .X.：数字与集号一致，或为集号前补一个 0
+
+        :param file_name: 文件名
+        :return: (宽松模式集号集合, 最宽松模式集号集合)
+        """
+        def _exact(token: str) -> Set[int]:
+            value = int(token)
+            return {value} if token == str(value) else set()
+
+        def _zero_padded(token: str) -> Set[int]:
+            found = _exact(token)
+            if len(token) > 1 and token[0] == "0":
+                found |= _exact(token[1:])
+            return found
+
+        loose: Set[int] = set()
+        for token in FileMatcher._CN_EPISODE_RE.findall(file_name):
+            loose |= _exact(token)
+        for token in FileMatcher._EP_EPISODE_RE.findall(file_name):
+            loose |= _exact(token)
+        for token in FileMatcher._E_EPISODE_RE.findall(file_name):
+            loose |= _zero_padded(token)
+
+        loosest: Set[int] = set()
+        for token in FileMatcher._NUM_EPISODE_RE.findall(file_name):
+            loosest |= _zero_padded(token)
+
+        return loose, loosest
+
+    @staticmethod
+    def match_episodes_bulk(
         files: List[dict],
         title: str,
         season: int,
-        episode: int,
+        episodes: Iterable[int],
         subscribe_filter: 'SubscribeFilter' = None
-    ) -> Optional[dict]:
+    ) -> Dict[int, dict]:
         """
-        匹配剧集文件
+        单次遍历文件列表，同时为多个集数匹配剧集文件
+        每个文件只解析一次，匹配结果与逐集调用 match_episode_file 一致
 
         :param files: 文件列表
         :param title: 剧集标题
         :param season: 季号
-        :param episode: 集号
+        :param episodes: 集号列表
         :param subscribe_filter: 订阅过滤条件（质量、分辨率、特效）
-        :return: 匹配的文件信息
+        :return: {集号: 匹配的文件信息}，未匹配的集数不包含在内
         """
-        # 宽松模式：不包含季号的匹配模式（需要额外验证）
-        loose_patterns = [
-            # 第1集、第175集 格式
-            rf'第\s*{episode}\s*集',
-            # EP01、EP175 格式
-            rf'[Ee][Pp]{episode}(?!\d)',
-            # E01格式（开头或特定位置）
-            rf'[\[\(\s\.\-_][Ee]0?{episode}[\]\)\s\.\-_]',
-        ]
-
-        # 最宽松模式：纯数字匹配（风险较高，仅作为最后手段）
-        # 仅当文件名没有 SxxExx 格式且明确匹配目标季或无季号标识时使用
-        loosest_patterns = [
-            # .01. 格式
-            rf'[\.\s\-_]0?{episode}[\.\s\-_]',
-        ]
-
-        # 收集候选文件，按匹配优先级排序
+        wanted = list(dict.fromkeys(episodes))
+        if not wanted:
+            return {}
+        wanted_set = set(wanted)
+
+        # 子目录中的匹配结果（按文件顺序，先匹配到的目录优先）
+        dir_matches: Dict[int, dict] = {}
+        # 收集候选文件，按匹配优先级分组
         # 每个元素是 (file, filter_score)，filter_score 越高越优先
-        strict_matches = []
-        loose_matches = []
-        loosest_matches = []
+        strict_matches: Dict[int, List[Tuple[dict, int]]] = {}
+        loose_matches: Dict[int, List[Tuple[dict, int]]] = {}
+        loosest_matches: Dict[int, List[Tuple[dict, int]]] = {}
 
-        # 诊断统计
+        # 诊断统计（集数不匹配按集号单独统计）
         stats = {
             "total_files": 0,
             "non_video": 0,
             "other_season": 0,
             "filter_rejected": 0,
-            "episode_mismatch": 0,
             "directories": 0,
         }
+        sxex_total = 0
+        sxex_hits: Dict[int, int] = {}
+        # 是否需要应用过滤条件，整个文件列表只判断一次
+        use_filter = bool(subscribe_filter and subscribe_filter.has_filters())
 
         for file in files:
             file_name = file.get("name", "")
@@ -245,9 +293,11 @@ class FileMatcher:
                 stats["directories"] += 1
                 sub_files = file.get("children", [])
                 if sub_files:
-                    matched = FileMatcher.match_episode_file(sub_files, title, season, episode, subscribe_filter)
-                    if matched:
-                        return matched
+                    pending = [ep for ep in wanted if ep not in dir_matches]
+                    if pending:
+                        dir_matches.update(
+                            FileMatcher.match_episodes_bulk(sub_files, title, season, pending, subscribe_filter)
+                        )
                 continue
 
             stats["total_files"] += 1
@@ -258,79 +308,101 @@ class FileMatcher:
                 stats["non_video"] += 1
                 continue
 
-            # 如果明确包含其他季的标识，直接跳过
-            if FileMatcher._contains_other_season(file_name, season):
+            # 如果明确包含其他季的标识，直接跳过（季号标识只解析一次）
+            season_marks = FileMatcher._parse_season_marks(file_name)
+            if FileMatcher._contains_other_season(file_name, season, season_marks):
                 stats["other_season"] += 1
-                logger.info(f"文件 {file_name} 属于其他季，跳过（目标: S{season}）")
+                logger.debug(f"文件 {file_name} 属于其他季，跳过（目标: S{season}）")
                 continue
 
             # 应用订阅过滤条件
             filter_score = 0
-            if subscribe_filter and subscribe_filter.has_filters():
+            if use_filter:
                 matched, filter_score = subscribe_filter.match(file_name)
                 if not matched:
                     stats["filter_rejected"] += 1
-                    logger.info(f"文件 {file_name} 不符合订阅过滤条件，跳过")
+                    logger.debug(f"文件 {file_name} 不符合订阅过滤条件，跳过")
                     continue
 
             # 优先检查 SxxExx 格式（最准确）
             sxex_info = FileMatcher._extract_episode_from_sxex(file_name)
             if sxex_info:
                 found_season, found_episode = sxex_info
+                sxex_total += 1
                 # 如果有明确的 SxxExx 格式，必须精确匹配，不再使用其他模式
-                if found_season == season and found_episode == episode:
-                    strict_matches.append((file, filter_score))
-                else:
-                    stats["episode_mismatch"] += 1
-                    # logger.info(f"文件 {file_name} 集数不匹配（找到: S{found_season}E{found_episode}，目标: S{season}E{episode}）")
-                # 不匹配则跳过这个文件，不再尝试其他模式
+                if found_season == season and found_episode in wanted_set:
+                    strict_matches.setdefault(found_episode, []).append((file, filter_score))
+                    sxex_hits[found_episode] = sxex_hits.get(found_episode, 0) + 1
                 continue
 
             # 没有 SxxExx 格式时，使用宽松模式匹配
-            for pattern in loose_patterns:
-                if re.search(pattern, file_name, re.IGNORECASE):
-                    # 额外检查：如果是第一季，或者文件名明确匹配目标季
-                    if season == 1 or FileMatcher._matches_target_season(file_name, season):
-                        loose_matches.append((file, filter_score))
-                    # 如果文件名没有任何季号标识，也接受（可能是单季剧）
-                    elif not re.search(r'[Ss]\d+[Ee]|第\s*\d+\s*季|[Ss]eason\s*\d+', file_name, re.IGNORECASE):
-                        loose_matches.append((file, filter_score))
+            loose_eps, loosest_eps = FileMatcher._parse_loose_episodes(file_name)
+            loose_hits = loose_eps & wanted_set
+            loosest_hits = (loosest_eps & wanted_set) - loose_eps
+            if not loose_hits and not loosest_hits:
+                continue
+
+            matches_target = FileMatcher._matches_target_season(file_name, season, season_marks)
+            if loose_hits:
+                # 额外检查：如果是第一季，或者文件名明确匹配目标季
+                # 如果文件名没有任何季号标识，也接受（可能是单季剧）
+                if season == 1 or matches_target or not FileMatcher._SEASON_MARK_RE.search(file_name):
+                    for ep in loose_hits:
+                        loose_matches.setdefault(ep, []).append((file, filter_score))
+            # 最宽松模式：仅当文件名明确匹配目标季时使用
+            if loosest_hits and matches_target:
+                for ep in loosest_hits:
+                    loosest_matches.setdefault(ep, []).append((file, filter_score))
+
+        # 按优先级返回匹配结果（同级别内按 filter_score 降序，分数相同时保持文件顺序）
+        results: Dict[int, dict] = {}
+        for ep in wanted:
+            # 子目录中的匹配优先于当前层级的文件（与逐集匹配时遇到子目录命中即返回的行为一致）
+            if ep in dir_matches:
+                results[ep] = dir_matches[ep]
+                continue
+            for candidates in (strict_matches.get(ep), loose_matches.get(ep), loosest_matches.get(ep)):
+                if candidates:
+                    results[ep] = max(candidates, key=lambda x: x[1])[0]
                     break
             else:
-                # 最宽松模式：仅当文件名明确匹配目标季时使用
-                if FileMatcher._matches_target_season(file_name, season):
-                    for pattern in loosest_patterns:
-                        if re.search(pattern, file_name, re.IGNORECASE):
-                            loosest_matches.append((file, filter_score))
-                            break
-
-        # 按优先级返回匹配结果（同级别内按 filter_score 降序排序）
-        if strict_matches:
-            strict_matches.sort(key=lambda x: x[1], reverse=True)
-            return strict_matches[0][0]
-        if loose_matches:
-            loose_matches.sort(key=lambda x: x[1], reverse=True)
-            return loose_matches[0][0]
-        if loosest_matches:
-            loosest_matches.sort(key=lambda x: x[1], reverse=True)
-            return loosest_matches[0][0]
-
-        # 没有匹配时，输出诊断信息
-        if stats["total_files"] > 0:
-            reasons = []
-            if stats["other_season"] > 0:
-                reasons.append(f"季数不匹配:{stats['other_season']}个")
-            if stats["episode_mismatch"] > 0:
-                reasons.append(f"集数不匹配:{stats['episode_mismatch']}个")
-            if stats["filter_rejected"] > 0:
-                reasons.append(f"过滤条件不符:{stats['filter_rejected']}个")
-            if stats["non_video"] > 0:
-                reasons.append(f"非视频文件:{stats['non_video']}个")
-            
-            if reasons:
-                logger.info(f"S{season}E{episode} 无匹配 - 视频文件{stats['total_files']}个, {', '.join(reasons)}")
+                # 没有匹配时，输出诊断信息
+                if stats["total_files"] > 0:
+                    episode_mismatch = sxex_total - sxex_hits.get(ep, 0)
+                    reasons = []
+                    if stats["other_season"] > 0:
+                        reasons.append(f"季数不匹配:{stats['other_season']}个")
+                    if episode_mismatch > 0:
+                        reasons.append(f"集数不匹配:{episode_mismatch}个")
+                    if stats["filter_rejected"] > 0:
+                        reasons.append(f"过滤条件不符:{stats['filter_rejected']}个")
+                    if stats["non_video"] > 0:
+                        reasons.append(f"非视频文件:{stats['non_video']}个")
+
+                    if reasons:
+                        logger.info(f"S{season}E{ep} 无匹配 - 视频文件{stats['total_files']}个, {', '.join(reasons)}")
+
+        return results
 
-        return None
+    @staticmethod
+    def match_episode_file(
+        files: List[dict],
+        title: str,
+        season: int,
+        episode: int,
+        subscribe_filter: 'SubscribeFilter' = None
+    ) -> Optional[dict]:
+        """
+        匹配剧集文件
+
+        :param files: 文件列表
+        :param title: 剧集标题
+        :param season: 季号
+        :param episode: 集号
+        :param subscribe_filter: 订阅过滤条件（质量、分辨率、特效）
+        :return: 匹配的文件信息
+        """
+        return FileMatcher.match_episodes_bulk(files, title, season, [episode], subscribe_filter).get(episode)
 
     @staticmethod
     def match_movie_file(
@@ -351,6 +423,8 @@ class FileMatcher:
         # 候选列表：(file, filter_score)
         candidates = []
         min_size_bytes = min_size_mb * 1024 * 1024
+        # 是否需要应用过滤条件，只判断一次
+        use_filter = bool(subscribe_filter and subscribe_filter.has_filters())
 
         def collect_video_files(file_list: List[dict]):
             """递归收集所有视频文件"""
@@ -376,10 +450,10 @@ class FileMatcher:
 
                 # 应用订阅过滤条件
                 filter_score = 0
-                if subscribe_filter and subscribe_filter.has_filters():
+                if use_filter:
                     matched, filter_score = subscribe_filter.match(file_name)
                     if not matched:
-                        logger.info(f"电影文件 {file_name} 不符合订阅过滤条件，跳过")
+                        logger.debug(f"电影文件 {file_name} 不符合订阅过滤条件，跳过")
                         continue
 
                 candidates.append((file, filter_score))
@@ -457,7 +531,7 @@ class FileMatcher:
 
                 # 检查是否包含其他季的标识，如果是则跳过
                 if FileMatcher._contains_other_season(file_name, season):
-                    logger.info(f"跳过其他季文件: {file_name}")
+                    logger.debug(f"跳过其他季文件: {file_name}")
                     continue
 
                 # 使用MetaInfo识别文件信息
@@ -474,7 +548,7 @@ class FileMatcher:
 
                 if season_matches and meta.begin_episode:
                     existing_episodes.add(meta.begin_episode)
-                    logger.info(f"识别到已存在集数: {file_name} -> S{season:02d}E{meta.begin_episode:02d}")
+                    logger.debug(f"识别到已存在集数: {file_name} -> S{season:02d}E{meta.begin_episode:02d}")
 
                     # 如果是剧集范围（如E01-E03），添加所有集数
                     if meta.end_episode and meta.end_episode != meta.begin_episode: